@@ -0,0 +1,678 @@
+# analysis.py
+# Повний конвеєр аналізу двох періодів без залежності від Streamlit: завантаження й категоризація
+# відео, статистика по категоріях, аналітика GPT по кожній категорії, загальні підсумки та звіт.
+#
+# Виконується у фоновому процесі (analysis_worker.py) як задача з черги job_queue.py, тож закриття
+# вкладки чи перезапуск скрипта Streamlit не зупиняє роботу, а однаковий аналіз із кількох сесій
+# виконується один раз. app.py лише ставить задачу, показує прогрес і рендерить збережений результат.
+
+import time
+from datetime import date
+
+import openai
+import pandas as pd
+
+import video_store
+from boilerplate import load_channel_boilerplate, strip_boilerplate
+from near_duplicates import get_channel_index, video_text
+from categorization import (
+    CATEGORIES, PROMPT_VERSION, build_categorization_request, parse_category_response, get_default_other_category
+)
+from youtube_fetch import iter_channel_video_pages
+from pipeline import prefetch
+from sampling import draw_stratified_sample, estimate_category_stats, format_interval
+from video_search import title_terms
+from tracing import get_tracer, incr, record_openai_usage, span, start_stage
+
+# Колонки відео, що залишаються в результаті (опис потрібен лише для промпту і лежить у сховищі)
+VIDEO_COLUMNS = ['id', 'title', 'views', 'published_at', 'duration_seconds', 'category']
+# Скільки останніх категоризованих відео зберігати в прогресі задачі для "живої" таблиці
+LIVE_TABLE_ROWS = 15
+# Як часто (секунди) записувати прогрес категоризації в чергу
+PROGRESS_INTERVAL_SECONDS = 1.0
+# Розмір вибірки на період за замовчуванням у режимі оцінки
+DEFAULT_SAMPLE_SIZE = 200
+# Порціями якого розміру категоризується вибірка (як сторінка YouTube API)
+SAMPLE_BATCH_SIZE = 50
+# Підтема категорії - слово з назв щонайменше SUBTOPIC_MIN_VIDEOS відео категорії (за обидва періоди),
+# але не з більшості назв (SUBTOPIC_MAX_SHARE), бо тоді воно описує всю категорію
+SUBTOPIC_MIN_VIDEOS = 3
+SUBTOPIC_MAX_SHARE = 0.8
+SUBTOPIC_LIMIT = 8
+
+# Етапи аналізу та їх підписи для сторінки прогресу
+STAGE_LABELS = {
+    "fetch_and_categorize.period1": "Завантаження та категоризація відео (Період 1)",
+    "fetch_and_categorize.period2": "Завантаження та категоризація відео (Період 2)",
+    "category_aggregation": "Статистика по категоріях",
+    "category_insights": "Аналітика GPT по категоріях",
+    "overall_summary": "Загальні підсумки GPT",
+    "report": "Формування звіту",
+}
+
+
+def categorize_video_gpt(title, description, categories_list, warnings):
+    """
+    Категоризує відео за допомогою GPT з деталізованими інструкціями та прикладами.
+    Промпт формується в categorization.py - той самий використовується і в batch_backfill.py.
+    Якщо запит до OpenAI не вдався, повертає None: тимчасова помилка не повинна ставати категорією.
+    """
+    default_other_category = get_default_other_category(categories_list)
+    if default_other_category is None: # Дуже малоймовірний випадок, коли список категорій порожній
+        return "Категорія не визначена (список категорій порожній)"
+
+    try:
+        with span("openai.categorize", category="openai"):
+            response = openai.chat.completions.create(
+                **build_categorization_request(title, description, categories_list)
+            )
+        record_openai_usage(response, "openai.categorize")
+        return parse_category_response(response.choices[0].message.content, categories_list)
+
+    except Exception as e:
+        warnings.append(f"Помилка OpenAI при категоризації відео '{title}': {e}")
+        return None
+
+
+def categorize_videos_page(conn, duplicate_index, boilerplate_lines, videos, categorization_stats, warnings,
+                           on_video=None):
+    """
+    Проставляє 'category' кожному відео сторінки (список словників, на місці).
+    Спершу береться кеш категорій зі сховища (туди ж пишуть результати batch_backfill.py),
+    далі - категорія майже ідентичного вже категоризованого відео (серії, перезаливи),
+    і лише для решти викликається GPT. Кожна категорія одразу записується у сховище.
+    З опису перед промптом вирізається повторюваний підвал каналу (соцмережі, донати, хештеги).
+    Статистика джерел категорій накопичується в categorization_stats.
+    """
+    cached_categories = video_store.get_cached_categories(conn, [video['id'] for video in videos], PROMPT_VERSION)
+    categorization_stats['from_cache'] += len(cached_categories)
+    incr("category.store_cache_hits", len(cached_categories))
+
+    for position, video in enumerate(videos, start=1):
+        category = cached_categories.get(video['id'])
+        if category is None:
+            signature = duplicate_index.signature(video_text(video['title'], video['description'], boilerplate_lines))
+            match = duplicate_index.find(signature=signature, exclude_id=video['id']) if signature is not None else None
+            if match:
+                matched_id, category, similarity = match
+                incr("category.near_duplicate_hits")
+                video_store.save_categories(conn, {video['id']: category}, PROMPT_VERSION, source="near_duplicate")
+                categorization_stats['reused'].append(
+                    {'title': video['title'], 'matched_id': matched_id, 'category': category, 'similarity': similarity}
+                )
+            else:
+                description = strip_boilerplate(video['description'], boilerplate_lines)
+                incr("category.gpt_lookups")
+                category = categorize_video_gpt(video['title'], description, CATEGORIES, warnings)
+                if category is None:
+                    # Запит не вдався: показуємо відео в "Різне", але не кешуємо і не додаємо в індекс
+                    # схожих відео - воно залишиться без категорії для наступного запуску або batch_backfill.py
+                    incr("category.gpt_failures")
+                    category = get_default_other_category(CATEGORIES)
+                else:
+                    video_store.save_categories(conn, {video['id']: category}, PROMPT_VERSION, source="sync")
+                    if signature is not None:
+                        duplicate_index.add(video['id'], None, category, signature=signature)
+                with span("sleep", category="sleep"):
+                    time.sleep(0.1)
+        video['category'] = category
+        if on_video:
+            on_video(position)
+
+
+def analyze_period(conn, duplicate_index, boilerplate_lines, api_key, channel_id, start_date, end_date, period_name,
+                   warnings, report_progress, fetch_cache=None, sample_size=None):
+    """
+    Потоково завантажує та категоризує відео за період.
+    Сторінки YouTube вантажаться у фоновому потоці (pipeline.prefetch) і через обмежену чергу
+    потрапляють у категоризацію, поки наступні сторінки ще завантажуються. Кожна сторінка одразу
+    пишеться у сховище, а прогрес (з останніми категоризованими відео) - у чергу задач.
+    У режимі оцінки (sample_size) сторінки лише зберігаються, а після завантаження всього періоду
+    категоризується тільки стратифікована вибірка (sampling.py); рядки тоді мають поле 'stratum'.
+    Повертає (список рядків з VIDEO_COLUMNS, статистика джерел категорій, опис вибірки або None).
+    """
+    categorization_stats = {'from_cache': 0, 'reused': []}
+    rows = []
+    population = []
+    sample = []
+    last_report = [0.0]
+
+    def show_progress(position_in_page, force=False):
+        now = time.monotonic()
+        if force or now - last_report[0] >= PROGRESS_INTERVAL_SECONDS:
+            last_report[0] = now
+            progress = {'period': period_name, 'processed': len(rows) + position_in_page,
+                        'recent': rows[-LIVE_TABLE_ROWS:]}
+            if sample_size is not None:
+                progress['sample'] = len(sample)
+            report_progress(progress)
+
+    def categorize(videos):
+        categorize_videos_page(conn, duplicate_index, boilerplate_lines, videos, categorization_stats, warnings,
+                               on_video=show_progress)
+        rows.extend({column: video.get(column) for column in VIDEO_COLUMNS} for video in videos)
+        show_progress(0, force=True)
+
+    pages = prefetch(iter_channel_video_pages(api_key, channel_id, start_date, end_date, fetch_cache=fetch_cache))
+    try:
+        while True:
+            # Перехоплюємо лише помилки завантаження (їх prefetch прокидає з фонового потоку в next).
+            # Помилки категоризації та сховища не маскуються під помилку YouTube: задача має впасти,
+            # а не завершитися з неповними даними
+            try:
+                page = next(pages)
+            except StopIteration:
+                break
+            except Exception as e:
+                warnings.append(f"{period_name}: помилка при отриманні даних з YouTube: {e}")
+                break
+
+            # Зберігаємо всі завантажені відео у сховище, щоб їх можна було докатегоризувати офлайн (batch_backfill.py)
+            try:
+                video_store.upsert_videos(conn, channel_id, page)
+            except Exception as e:
+                warnings.append(f"Не вдалося зберегти відео у локальне сховище: {e}")
+
+            if sample_size is None:
+                categorize(page)
+            else:
+                population.extend(page)
+                report_progress({'period': period_name, 'fetched': len(population)})
+    finally:
+        pages.close()
+
+    sampling_info = None
+    if sample_size is not None:
+        sample, stratum_of, strata_sizes = draw_stratified_sample(population, sample_size)
+        for start in range(0, len(sample), SAMPLE_BATCH_SIZE):
+            categorize(sample[start:start + SAMPLE_BATCH_SIZE])
+        for row in rows:
+            row['stratum'] = stratum_of[row['id']]
+        sampling_info = {
+            'population': len(population),
+            'sample': len(sample),
+            'strata': len(strata_sizes),
+            'sampled_strata': len({row['stratum'] for row in rows}),
+            # Перегляди відомі для всіх відео, тож загальне середнє - точне, а не оцінка
+            'average_views': sum(video['views'] for video in population) / len(population) if population else 0,
+            'strata_sizes': strata_sizes,
+        }
+
+    for row in rows:
+        row['published_at'] = str(row['published_at'])
+    return rows, categorization_stats, sampling_info
+
+
+def compute_overall_stats(total_videos_p1, avg_views_p1, total_videos_p2, avg_views_p2):
+    """Загальна кількість відео, середні перегляди за періоди та їх динаміка."""
+    delta_avg_views_overall = 0
+    delta_percent_overall = 0.0
+    if total_videos_p1 > 0 and total_videos_p2 > 0 and avg_views_p1 > 0:
+        delta_avg_views_overall = avg_views_p2 - avg_views_p1
+        delta_percent_overall = (delta_avg_views_overall / avg_views_p1) * 100
+    return {
+        'total_videos_p1': total_videos_p1, 'avg_views_p1': avg_views_p1,
+        'total_videos_p2': total_videos_p2, 'avg_views_p2': avg_views_p2,
+        'delta_avg_views': delta_avg_views_overall, 'delta_percent': delta_percent_overall,
+    }
+
+
+# 3.1: Кількість відео та середні перегляди по категоріях + динаміка
+def get_category_stats_df(df):
+    """Кількість відео та середні перегляди по категоріях для одного періоду."""
+    if df.empty or 'category' not in df.columns:
+        return pd.DataFrame(columns=['category', 'video_count', 'average_views'])
+    stats = df.groupby('category').agg(
+        video_count=('id', 'count'),
+        average_views=('views', 'mean')
+    ).reset_index()
+    stats['average_views'] = pd.to_numeric(stats['average_views'], errors='coerce').fillna(0)
+    stats['average_views'] = stats['average_views'].round(0).astype(int)
+    return stats
+
+
+def _order_by_categories(merged_category_stats):
+    # Категорії, яких немає у списку CATEGORIES, йдуть у кінці
+    merged_category_stats['category_order'] = merged_category_stats['category'].apply(
+        lambda x: CATEGORIES.index(x) if x in CATEGORIES else len(CATEGORIES)
+    )
+    return merged_category_stats.sort_values(by=['category_order', 'category']).drop(
+        columns=['category_order']).reset_index(drop=True)
+
+
+def build_merged_category_stats(videos_p1_df, videos_p2_df):
+    """
+    Зведена статистика по категоріях за обидва періоди (count_p1, avg_views_p1, count_p2, avg_views_p2),
+    впорядкована так само, як список CATEGORIES.
+    """
+    category_stats_p1 = get_category_stats_df(videos_p1_df)
+    category_stats_p2 = get_category_stats_df(videos_p2_df)
+
+    merged_category_stats = pd.merge(
+        category_stats_p1.rename(columns={'video_count': 'count_p1', 'average_views': 'avg_views_p1'}),
+        category_stats_p2.rename(columns={'video_count': 'count_p2', 'average_views': 'avg_views_p2'}),
+        on='category',
+        how='outer'
+    ).fillna(0)
+
+    for col in ['count_p1', 'avg_views_p1', 'count_p2', 'avg_views_p2']:
+        merged_category_stats[col] = pd.to_numeric(merged_category_stats[col], errors='coerce').fillna(0).astype(
+            int)
+    return _order_by_categories(merged_category_stats)
+
+
+def build_estimated_category_stats(estimates_p1, estimates_p2):
+    """
+    Те саме, що build_merged_category_stats, але з оцінок за вибіркою (sampling.estimate_category_stats):
+    count_* та avg_views_* - точкові оцінки, *_low / *_high - межі 95% довірчого інтервалу.
+    """
+    merged_parts = []
+    for estimates, suffix in ((estimates_p1, 'p1'), (estimates_p2, 'p2')):
+        merged_parts.append(estimates[[
+            'category', 'video_count', 'video_count_low', 'video_count_high',
+            'average_views', 'average_views_low', 'average_views_high'
+        ]].rename(columns={
+            'video_count': f'count_{suffix}', 'video_count_low': f'count_{suffix}_low',
+            'video_count_high': f'count_{suffix}_high', 'average_views': f'avg_views_{suffix}',
+            'average_views_low': f'avg_views_{suffix}_low', 'average_views_high': f'avg_views_{suffix}_high'
+        }))
+    merged_category_stats = pd.merge(merged_parts[0], merged_parts[1], on='category', how='outer').fillna(0)
+    for col in merged_category_stats.columns.drop('category'):
+        merged_category_stats[col] = pd.to_numeric(merged_category_stats[col], errors='coerce').fillna(0).astype(int)
+    return _order_by_categories(merged_category_stats)
+
+
+# Функція для поглибленої аналітики категорії від GPT
+def get_category_subtopics(videos_p1_df_cat, videos_p2_df_cat, min_videos=SUBTOPIC_MIN_VIDEOS,
+                           max_share=SUBTOPIC_MAX_SHARE, limit=SUBTOPIC_LIMIT):
+    """
+    Точна статистика підтем категорії: слова назв (за правилами пошукового індексу), що трапляються
+    в кількох відео категорії. Повертає до limit записів {'term', 'count_p1', 'avg_views_p1',
+    'count_p2', 'avg_views_p2'}, найчастіші першими.
+    """
+    views_by_term = {}
+    for position, df in enumerate((videos_p1_df_cat, videos_p2_df_cat)):
+        for title, views in zip(df['title'], df['views']):
+            for term in title_terms(title):
+                views_by_term.setdefault(term, ([], []))[position].append(int(views))
+
+    total_videos = len(videos_p1_df_cat) + len(videos_p2_df_cat)
+    subtopics = []
+    for term, (views_p1, views_p2) in views_by_term.items():
+        count = len(views_p1) + len(views_p2)
+        if count < min_videos or count > max_share * total_videos:
+            continue
+        subtopics.append({
+            'term': term,
+            'count_p1': len(views_p1), 'avg_views_p1': round(sum(views_p1) / len(views_p1)) if views_p1 else 0,
+            'count_p2': len(views_p2), 'avg_views_p2': round(sum(views_p2) / len(views_p2)) if views_p2 else 0,
+        })
+    subtopics.sort(key=lambda item: (-(item['count_p1'] + item['count_p2']), item['term']))
+    return subtopics[:limit]
+
+
+def get_category_insights_gpt(category_name, videos_p1_df_cat, videos_p2_df_cat, avg_total_views_p1, avg_total_views_p2,
+                              period1_dates, period2_dates, warnings, category_stats=None, subtopics=None):
+    """
+    Генерує аналітику для конкретної категорії за допомогою GPT.
+    category_stats - рядок оцінок за вибіркою (режим оцінки): тоді кількість і середні перегляди
+    беруться з оцінок, а датафрейми містять лише відео вибірки (для прикладів).
+    subtopics - точна статистика підтем (get_category_subtopics), яку GPT лише інтерпретує.
+    """
+
+    def format_video_list_for_gpt(df, period_name, max_videos=5):
+        if df is None or df.empty:
+            return f"Дані за {period_name} в цій категорії відсутні або їх небагато.\n"
+
+        # Сортуємо за переглядами, показуємо найпопулярніші
+        df_sorted = df.sort_values(by='views', ascending=False).head(max_videos)
+
+        list_str = f"Приклади відео та їх перегляди ({period_name}, до {max_videos} найпопулярніших):\n"
+        if df_sorted.empty:
+            return list_str + "- Відео в цій категорії та періоді не знайдено.\n"
+        for _, row in df_sorted.iterrows():
+            list_str += f"- \"{row['title']}\" (Перегляди: {row['views']:,})\n"
+        return list_str
+
+    cat_avg_views_p1 = videos_p1_df_cat['views'].mean() if not videos_p1_df_cat.empty else 0
+    cat_avg_views_p2 = videos_p2_df_cat['views'].mean() if not videos_p2_df_cat.empty else 0
+    cat_count_p1, cat_count_p2 = len(videos_p1_df_cat), len(videos_p2_df_cat)
+    estimate_note = ""
+    if category_stats is not None:
+        cat_avg_views_p1, cat_avg_views_p2 = category_stats['avg_views_p1'], category_stats['avg_views_p2']
+        cat_count_p1, cat_count_p2 = category_stats['count_p1'], category_stats['count_p2']
+        estimate_note = " (оцінка за стратифікованою вибіркою)"
+
+    subtopics_str = "Підтеми не виділено (немає слів, спільних для кількох назв відео категорії).\n"
+    if subtopics:
+        scope = "відео вибірки" if category_stats is not None else "усі відео категорії"
+        subtopics_str = f"Точна статистика підтем (слова з назв відео, {scope}):\n"
+        for subtopic in subtopics:
+            subtopics_str += (
+                f"- \"{subtopic['term']}\": Період 1 - {subtopic['count_p1']} відео, Ø {subtopic['avg_views_p1']:,}; "
+                f"Період 2 - {subtopic['count_p2']} відео, Ø {subtopic['avg_views_p2']:,}\n"
+            )
+
+    prompt = f"""
+    Ти – досвідчений аналітик YouTube-контенту каналу "Армія TV". Проаналізуй категорію "{category_name}".
+
+    Період 1: {period1_dates[0].strftime('%Y-%m-%d')} - {period1_dates[1].strftime('%Y-%m-%d')}
+    Період 2: {period2_dates[0].strftime('%Y-%m-%d')} - {period2_dates[1].strftime('%Y-%m-%d')}
+
+    Загальні середні перегляди на каналі:
+    - Період 1: {avg_total_views_p1:,.0f}
+    - Період 2: {avg_total_views_p2:,.0f}
+
+    Дані по категорії "{category_name}"{estimate_note}:
+    - Сер. перегляди (Період 1): {cat_avg_views_p1:,.0f} (Кількість відео: {cat_count_p1})
+    - Сер. перегляди (Період 2): {cat_avg_views_p2:,.0f} (Кількість відео: {cat_count_p2})
+    {format_video_list_for_gpt(videos_p1_df_cat, "Період 1")}
+    {format_video_list_for_gpt(videos_p2_df_cat, "Період 2")}
+    {subtopics_str}
+    Надай стислу, але змістовну аналітику для категорії "{category_name}" (максимум 150 слів):
+    1.  **Стабільність та інтерес:** Чи стабільні перегляди всередині категорії? Чи викликає тема інтерес? Як змінився інтерес порівняно з попереднім періодом?
+    2.  **Підгрупи/закономірності:** Які підтеми працюють краще/гірше (напр., в "Танках" - Leopard vs Т-72)? Спирайся на точну статистику підтем, а не лише на приклади.
+    3.  **Порівняння з середнім по каналу:** Наскільки ефективна ця категорія порівняно із загальними показниками каналу?
+
+    Відповідай українською мовою.
+    """
+    try:
+        with span("openai.category_insights", category="openai", category_name=category_name):
+            response = openai.chat.completions.create(
+                model="gpt-4o-mini",  # Або "gpt-3.5-turbo" для економії, але якість може бути нижча
+                messages=[
+                    {"role": "system",
+                     "content": "Ти аналітик YouTube, що надає стислі та змістовні висновки по категоріях."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=350,  # Налаштуй за потребою
+                temperature=0.4
+            )
+        record_openai_usage(response, "openai.category_insights")
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        warnings.append(f"Помилка OpenAI при аналізі категорії '{category_name}': {e}")
+        return f"Не вдалося отримати аналітику для категорії '{category_name}' через помилку API."
+
+
+# Функція для генерації загальних підсумків
+def get_overall_summary_gpt(all_categories_stats_merged, avg_total_p1, avg_total_p2, period1_str, period2_str,
+                            warnings):
+    """Генерує загальні висновки та рекомендації на основі всіх даних."""
+    categories_data_str = "Зведена статистика по категоріях:\n"
+    if all_categories_stats_merged.empty:
+        categories_data_str += "Дані по категоріях відсутні для аналізу.\n"
+    else:
+        for _, row in all_categories_stats_merged.iterrows():
+            categories_data_str += f"- Категорія: {row['category']}\n"
+            for suffix, name in (('p1', "Період 1"), ('p2', "Період 2")):
+                categories_data_str += (f"  {name}: Відео: {int(row[f'count_{suffix}'])}, "
+                                        f"Сер.перегляди: {int(row[f'avg_views_{suffix}']):,}")
+                if f'count_{suffix}_low' in row:
+                    categories_data_str += (
+                        f" (оцінка; 95% ДІ відео: {format_interval(row[f'count_{suffix}_low'], row[f'count_{suffix}_high'])}, "
+                        f"перегляди: {format_interval(row[f'avg_views_{suffix}_low'], row[f'avg_views_{suffix}_high'])})"
+                    )
+                categories_data_str += "\n"
+
+            # Динаміка
+            avg1, avg2 = row['avg_views_p1'], row['avg_views_p2']
+            if avg1 > 0 and avg2 > 0:
+                change = ((avg2 - avg1) / avg1) * 100
+                categories_data_str += f"  Динаміка сер. переглядів: {change:+.1f}%\n\n"
+            elif avg2 > 0:
+                categories_data_str += f"  Динаміка сер. переглядів: З'явилися нові перегляди.\n\n"
+            else:
+                categories_data_str += f"  Динаміка сер. переглядів: Немає даних для порівняння.\n\n"
+
+    prompt = f"""
+    Ти – головний контент-стратег YouTube-каналу "Армія TV". Проаналізуй дані за два періоди.
+    Період 1: {period1_str}
+    Період 2: {period2_str}
+
+    Загальні середні перегляди на каналі:
+    - Період 1: {avg_total_p1:,.0f}
+    - Період 2: {avg_total_p2:,.0f}
+
+    {categories_data_str}
+
+    Твоє завдання – зробити розгорнутий, але чіткий висновок (близько 250-350 слів), який включатиме:
+    1.  **Ключові тенденції:** Які загальні зміни відбулися в ефективності контенту між періодами?
+    2.  **Успішні сюжети/характеристики:** Визнач риси, притаманні успішним сюжетам. Наприклад: "бронетехніка західного зразка і українська бронетехніка; трофейна зброя і техніка; розпаковка техніки, її начинка; авіація; бої і динаміка; ексклюзивність". Можеш використовувати ці приклади, якщо вони підтверджуються даними, або запропонуй свої.
+    3.  **Неуспішні сюжети/характеристики:** Визнач риси, притаманні неуспішним сюжетам. Наприклад: "радянська техніка, особливо РСЗВ; дрони (якщо це так); портретні історії про видатних бійців (якщо це так); снайпери". Можеш використовувати ці приклади або запропонуй свої.
+    4.  **Стратегічні рекомендації:** Які 2-3 конкретні поради ти можеш дати команді для покращення контент-плану та підвищення ефективності відео?
+
+    Будь об'єктивним, спирайся на надані цифри, але також роби обґрунтовані припущення щодо причинно-наслідкових зв'язків. Відповідай українською мовою.
+    """
+    try:
+        with span("openai.overall_summary", category="openai"):
+            response = openai.chat.completions.create(
+                model="gpt-4o",  # Ця модель найкраще підходить для таких завдань
+                messages=[
+                    {"role": "system", "content": "Ти головний контент-стратег, що готує фінальний звіт з рекомендаціями."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=800,  # Більше токенів для детального звіту
+                temperature=0.5
+            )
+        record_openai_usage(response, "openai.overall_summary")
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        warnings.append(f"Помилка OpenAI при генерації підсумків: {e}")
+        return "Не вдалося згенерувати підсумки через помилку API."
+
+
+def period_label(start_date, end_date):
+    return f"{start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}"
+
+
+def run_analysis(conn, params, youtube_api_key, report_progress, fetch_cache=None):
+    """
+    Виконує аналіз задачі з черги. params - словник job_queue (channel_id, periods [[початок, кінець], ...]
+    у форматі ISO, sample_size - розмір вибірки на період у режимі оцінки або None для повного аналізу).
+    report_progress(stage, progress) зберігає прогрес етапу.
+    Повертає JSON-сумісний словник результату, з якого app.py рендерить сторінку.
+    """
+    channel_id = params['channel_id']
+    sample_size = params.get('sample_size')
+    (date_start_1, date_end_1), (date_start_2, date_end_2) = [
+        (date.fromisoformat(start), date.fromisoformat(end)) for start, end in params['periods']
+    ]
+    period1_label = period_label(date_start_1, date_end_1)
+    period2_label = period_label(date_start_2, date_end_2)
+    warnings = []
+
+    boilerplate_lines = load_channel_boilerplate(conn, channel_id)
+    # Індекс живе весь час роботи воркера і лише дочитує категорії, записані з попередньої задачі
+    duplicate_index = get_channel_index(conn, channel_id, PROMPT_VERSION, boilerplate_lines)
+
+    periods = []
+    for stage, period_name, start_date, end_date in (
+            ("fetch_and_categorize.period1", "Період 1", date_start_1, date_end_1),
+            ("fetch_and_categorize.period2", "Період 2", date_start_2, date_end_2)):
+        start_stage(stage)
+        report_progress(stage, {'period': period_name, 'processed': 0, 'recent': []})
+        rows, categorization_stats, sampling_info = analyze_period(
+            conn, duplicate_index, boilerplate_lines, youtube_api_key, channel_id, start_date, end_date, period_name,
+            warnings, lambda progress, stage=stage: report_progress(stage, progress), fetch_cache=fetch_cache,
+            sample_size=sample_size
+        )
+        periods.append({'videos': rows, 'categorization_stats': categorization_stats, 'sampling': sampling_info})
+
+    result = {'periods': periods, 'warnings': warnings, 'sample_size': sample_size,
+              'empty': not (periods[0]['videos'] or periods[1]['videos'])}
+    if result['empty']:
+        for period in periods:
+            if period['sampling']:
+                period['sampling'].pop('strata_sizes')
+        return result
+
+    videos_p1_df = pd.DataFrame(periods[0]['videos'], columns=VIDEO_COLUMNS)
+    videos_p2_df = pd.DataFrame(periods[1]['videos'], columns=VIDEO_COLUMNS)
+
+    start_stage("category_aggregation")
+    report_progress("category_aggregation", {})
+    with get_tracer().profiled("aggregation"):
+        if sample_size is None:
+            overall = compute_overall_stats(
+                len(videos_p1_df), float(videos_p1_df['views'].mean()) if not videos_p1_df.empty else 0,
+                len(videos_p2_df), float(videos_p2_df['views'].mean()) if not videos_p2_df.empty else 0
+            )
+            merged_category_stats = build_merged_category_stats(videos_p1_df, videos_p2_df)
+        else:
+            # Загальна кількість і середні перегляди відомі точно; по категоріях - оцінки за вибіркою
+            sampling_p1, sampling_p2 = periods[0]['sampling'], periods[1]['sampling']
+            overall = compute_overall_stats(sampling_p1['population'], sampling_p1['average_views'],
+                                            sampling_p2['population'], sampling_p2['average_views'])
+            merged_category_stats = build_estimated_category_stats(
+                estimate_category_stats(periods[0]['videos'], sampling_p1.pop('strata_sizes')),
+                estimate_category_stats(periods[1]['videos'], sampling_p2.pop('strata_sizes'))
+            )
+
+    start_stage("category_insights")
+    category_insights = {}
+    category_subtopics = {}
+    for position, category_name in enumerate(merged_category_stats['category'], start=1):
+        report_progress("category_insights", {'done': position - 1, 'total': len(merged_category_stats)})
+        videos_p1_df_cat = videos_p1_df[videos_p1_df['category'] == category_name]
+        videos_p2_df_cat = videos_p2_df[videos_p2_df['category'] == category_name]
+        with span("subtopics", category="aggregation", category_name=category_name):
+            category_subtopics[category_name] = get_category_subtopics(videos_p1_df_cat, videos_p2_df_cat)
+        category_insights[category_name] = get_category_insights_gpt(
+            category_name, videos_p1_df_cat, videos_p2_df_cat,
+            overall['avg_views_p1'], overall['avg_views_p2'],
+            (date_start_1, date_end_1), (date_start_2, date_end_2),
+            warnings,
+            category_stats=merged_category_stats.iloc[position - 1] if sample_size is not None else None,
+            subtopics=category_subtopics[category_name]
+        )
+        with span("sleep", category="sleep"):
+            time.sleep(0.2)
+
+    start_stage("overall_summary")
+    report_progress("overall_summary", {})
+    overall_summary = "Недостатньо даних для генерації загальних підсумків."
+    if not merged_category_stats.empty:
+        overall_summary = get_overall_summary_gpt(
+            merged_category_stats, overall['avg_views_p1'], overall['avg_views_p2'], period1_label, period2_label,
+            warnings
+        )
+
+    start_stage("report")
+    report_progress("report", {})
+    with get_tracer().profiled("report"):
+        report_markdown = generate_report_markdown(
+            period1_label, period2_label,
+            overall['total_videos_p1'], overall['avg_views_p1'],
+            overall['total_videos_p2'], overall['avg_views_p2'],
+            overall['delta_avg_views'], overall['delta_percent'],
+            merged_category_stats,
+            category_insights,
+            overall_summary,
+            sampling=[periods[0]['sampling'], periods[1]['sampling']] if sample_size is not None else None
+        )
+
+    result.update({
+        'overall': overall,
+        'category_stats': merged_category_stats.to_dict(orient='records'),
+        'category_insights': category_insights,
+        'category_subtopics': category_subtopics,
+        'overall_summary': overall_summary,
+        'report_markdown': report_markdown,
+    })
+    return result
+
+
+def generate_report_markdown(
+        period1_label, period2_label,
+        total_videos_p1, avg_views_p1,
+        total_videos_p2, avg_views_p2,
+        delta_avg_views_overall, delta_percent_overall,  # Ці змінні для загальної динаміки
+        merged_category_stats_df,  # DataFrame зі статистикою по категоріях
+        category_insights_dict,  # Словник, де ключ - назва категорії, значення - аналітика GPT
+        overall_summary_gpt,  # Загальний звіт GPT
+        sampling=None  # Опис вибірки для кожного періоду, якщо статистика по категоріях - оцінка
+):
+    """Генерує текстовий звіт у форматі Markdown."""
+
+    def interval(row, column):
+        # Довірчий інтервал поруч зі значенням, якщо статистика - оцінка за вибіркою
+        if f'{column}_low' not in row:
+            return ""
+        return f" (95% ДІ: {format_interval(row[f'{column}_low'], row[f'{column}_high'])})"
+
+    report_content = f"# Звіт з аналізу YouTube-каналу 'Армія TV'\n\n"
+    report_content += f"Дата генерації звіту: {date.today().strftime('%d.%m.%Y')}\n\n"  # Додаємо дату генерації
+    report_content += f"## Аналізовані Періоди\n"
+    report_content += f"- **Період 1:** {period1_label}\n"
+    report_content += f"- **Період 2:** {period2_label}\n\n"
+
+    report_content += f"## Загальна Статистика Переглядів\n"
+    report_content += f"### Період 1 ({period1_label})\n"
+    report_content += f"- Всього відео (що пройшли фільтрацію): {total_videos_p1}\n"
+    report_content += f"- Середня кількість переглядів на відео: {avg_views_p1:,.0f}\n\n"
+
+    report_content += f"### Період 2 ({period2_label})\n"
+    report_content += f"- Всього відео (що пройшли фільтрацію): {total_videos_p2}\n"
+    report_content += f"- Середня кількість переглядів на відео: {avg_views_p2:,.0f}\n\n"
+
+    # Динаміка загальних переглядів
+    if total_videos_p1 > 0 and total_videos_p2 > 0 and avg_views_p1 > 0:
+        report_content += f"**Динаміка середніх переглядів (Період 2 vs Період 1):** {delta_avg_views_overall:,.0f} ({delta_percent_overall:+.1f}%)\n\n"
+    elif total_videos_p1 == 0 and total_videos_p2 > 0:
+        report_content += f"**Динаміка середніх переглядів (Період 2 vs Період 1):** Дані за Період 1 відсутні, порівняння неможливе.\n\n"
+    elif total_videos_p1 > 0 and total_videos_p2 == 0:
+        report_content += f"**Динаміка середніх переглядів (Період 2 vs Період 1):** Дані за Період 2 відсутні, порівняння неможливе.\n\n"
+    else:
+        report_content += f"**Динаміка середніх переглядів (Період 2 vs Період 1):** Недостатньо даних для розрахунку динаміки.\n\n"
+
+    report_content += f"## Детальний Аналіз за Категоріями\n"
+    if sampling:
+        report_content += ("Кількість відео та середні перегляди по категоріях - оцінки за стратифікованою вибіркою "
+                           "(страти: місяць публікації x дециль переглядів) з 95% довірчими інтервалами.\n")
+        for name, info in zip(("Період 1", "Період 2"), sampling):
+            report_content += (f"- {name}: категоризовано {info['sample']} з {info['population']} відео "
+                               f"({info['sampled_strata']} з {info['strata']} страт)\n")
+        report_content += "\n"
+    if not merged_category_stats_df.empty:
+        for index, row_cat in merged_category_stats_df.iterrows():
+            report_content += f"### Категорія: {row_cat['category']}\n"
+            report_content += (f"- **Період 1:** Відео: {int(row_cat['count_p1'])}{interval(row_cat, 'count_p1')}, "
+                               f"Ø Перегляди: {int(row_cat['avg_views_p1']):,}{interval(row_cat, 'avg_views_p1')}\n")
+            report_content += (f"- **Період 2:** Відео: {int(row_cat['count_p2'])}{interval(row_cat, 'count_p2')}, "
+                               f"Ø Перегляди: {int(row_cat['avg_views_p2']):,}{interval(row_cat, 'avg_views_p2')}\n")
+
+            # Динаміка для категорії
+            avg1_cat = int(row_cat['avg_views_p1'])
+            avg2_cat = int(row_cat['avg_views_p2'])
+            count1_cat = int(row_cat['count_p1'])
+            count2_cat = int(row_cat['count_p2'])
+
+            if count1_cat > 0 and count2_cat > 0 and avg1_cat > 0:
+                cat_delta_avg = avg2_cat - avg1_cat
+                cat_delta_perc = (cat_delta_avg / avg1_cat) * 100 if avg1_cat != 0 else 0
+                report_content += f"  - Динаміка Ø переглядів категорії: {cat_delta_avg:,.0f} ({cat_delta_perc:+.1f}%)\n"
+            elif count2_cat > 0 and count1_cat == 0:
+                report_content += f"  - Динаміка Ø переглядів категорії: Нова активність у Періоді 2.\n"
+            elif count1_cat > 0 and count2_cat == 0:
+                report_content += f"  - Динаміка Ø переглядів категорії: Активність була лише у Періоді 1.\n"
+            else:
+                report_content += f"  - Динаміка Ø переглядів категорії: Недостатньо даних.\n"
+
+            if row_cat['category'] in category_insights_dict and category_insights_dict[row_cat['category']]:
+                report_content += f"\n  **Висновки GPT для категорії \"{row_cat['category']}\":**\n"
+                # Замінюємо переноси рядків на такі, що працюють в Markdown для багаторядкових блоків
+                insight_text = str(category_insights_dict[row_cat['category']]).replace('\n', '\n  ')
+                report_content += f"  {insight_text}\n\n"
+            else:
+                report_content += f"  Висновки GPT для категорії \"{row_cat['category']}\" відсутні.\n\n"
+    else:
+        report_content += "Дані по категоріях відсутні.\n\n"
+
+    report_content += f"## Загальні Підсумки та Рекомендації від GPT\n"
+    if overall_summary_gpt and overall_summary_gpt.strip() and overall_summary_gpt != "Недостатньо даних для генерації загальних підсумків.":
+        report_content += f"{overall_summary_gpt}\n"
+    else:
+        report_content += "Загальні підсумки та рекомендації від GPT не були згенеровані (або були порожніми).\n"
+
+    return report_content
@@ -0,0 +1,134 @@
+# analysis_worker.py
+# Фоновий процес, що виконує задачі аналізу з черги job_queue.py.
+#
+# Дашборд сам запускає воркер, якщо живого немає (spawn_worker), але воркери можна запускати
+# і вручну - кілька процесів безпечно ділять одну чергу. Воркер періодично відмічається в базі;
+# задачу "мертвого" воркера підхоплює інший.
+#
+# Приклади:
+#   python analysis_worker.py                      # обробляти задачі, доки не зупинять
+#   python analysis_worker.py --idle-exit 600      # завершитися після 10 хвилин без задач
+#   python analysis_worker.py --once               # виконати одну задачу (якщо є) і вийти
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+import openai
+
+import job_queue
+import tracing
+import video_store
+from analysis import run_analysis
+from batch_backfill import load_api_key
+from fetch_cache import create_fetch_cache
+
+DEFAULT_POLL_INTERVAL_SECONDS = 2.0
+# Скільки простоювати без задач воркеру, запущеному з дашборду
+AUTO_SPAWN_IDLE_EXIT_SECONDS = 600
+WORKER_LOG_PATH = "analysis_worker.log"
+
+
+def _heartbeat_loop(db_path, worker_id, stop):
+    # Окреме з'єднання: основне зайняте задачею, а відмітки мають іти і під час довгих викликів GPT
+    conn = job_queue.connect(db_path)
+    while not stop.wait(job_queue.HEARTBEAT_INTERVAL_SECONDS):
+        try:
+            job_queue.heartbeat(conn, worker_id)
+        except Exception as e:
+            print(f"Не вдалося оновити heartbeat: {e}", file=sys.stderr)
+    conn.close()
+
+
+def execute_job(conn, job, youtube_api_key, fetch_cache):
+    """Виконує одну задачу під трейсером і записує результат (або помилку) у чергу."""
+    params = job['params']
+    run_tracer = tracing.start_tracing(f"analysis_job{job['id']}", profile=params.get('profile', False))
+    try:
+        result = run_analysis(
+            conn, params, youtube_api_key,
+            lambda stage, progress: job_queue.update_progress(conn, job['id'], stage, progress),
+            fetch_cache=fetch_cache
+        )
+    except Exception:
+        tracing.stop_tracing()
+        job_queue.fail_job(conn, job['id'], traceback.format_exc())
+        return False
+    tracing.stop_tracing()
+    result['trace'] = {
+        'summary': run_tracer.summary(),
+        'counters': dict(run_tracer.counters),
+        'profiles': dict(run_tracer.profiles),
+        'path': run_tracer.save(),
+    }
+    job_queue.complete_job(conn, job['id'], result)
+    return True
+
+
+def run_worker(db_path=None, poll_interval=DEFAULT_POLL_INTERVAL_SECONDS, idle_exit=None, once=False):
+    youtube_api_key = load_api_key("YOUTUBE_API_KEY")
+    openai.api_key = load_api_key("OPENAI_API_KEY")
+    if not youtube_api_key or not openai.api_key:
+        print("Помилка: YOUTUBE_API_KEY або OPENAI_API_KEY не визначено.", file=sys.stderr)
+        return 1
+
+    conn = job_queue.connect(db_path)
+    fetch_cache = create_fetch_cache()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    job_queue.heartbeat(conn, worker_id)
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat_loop, args=(db_path, worker_id, stop), daemon=True).start()
+    print(f"Воркер {worker_id} запущено.")
+
+    idle_since = time.monotonic()
+    try:
+        while True:
+            job = job_queue.claim_next_job(conn, worker_id)
+            if job is None:
+                if once or (idle_exit and time.monotonic() - idle_since > idle_exit):
+                    return 0
+                time.sleep(poll_interval)
+                continue
+            print(f"Задача {job['id']}: {job['params']['periods']}")
+            succeeded = execute_job(conn, job, youtube_api_key, fetch_cache)
+            print(f"Задача {job['id']}: {'виконано' if succeeded else 'помилка'}")
+            idle_since = time.monotonic()
+            if once:
+                return 0
+    finally:
+        stop.set()
+        job_queue.remove_worker(conn, worker_id)
+
+
+def spawn_worker(db_path=None, env=None, idle_exit=AUTO_SPAWN_IDLE_EXIT_SECONDS):
+    """
+    Запускає воркер окремим процесом, незалежним від сесії Streamlit (переживає перезапуск скрипта).
+    env - додаткові змінні оточення (наприклад, API-ключі зі st.secrets).
+    """
+    command = [sys.executable, "-u", os.path.abspath(__file__), "--idle-exit", str(idle_exit),
+               "--db", os.path.abspath(db_path or video_store.DEFAULT_DB_PATH)]
+    with open(WORKER_LOG_PATH, "a", encoding="utf-8") as log_file:
+        return subprocess.Popen(
+            command, env={**os.environ, **(env or {})}, stdout=log_file, stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL, start_new_session=True
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Фоновий виконавець задач аналізу з черги.")
+    parser.add_argument("--db", default=None, help="Шлях до бази сховища (за замовчуванням AINALITICS_DB або ainalitics.db)")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL_SECONDS,
+                        help="Секунди між перевірками черги")
+    parser.add_argument("--idle-exit", type=float, default=None, help="Завершитися після стількох секунд без задач")
+    parser.add_argument("--once", action="store_true", help="Виконати одну задачу (якщо є) і вийти")
+    args = parser.parse_args(argv)
+    return run_worker(args.db, args.poll_interval, args.idle_exit, args.once)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+# batch_backfill.py
+# Офлайн-режим категоризації великих історичних періодів через OpenAI Batch API.
+#
+# Скрипт бере зі сховища (video_store.py) всі відео без категорії, записує їх у JSONL-файл
+# з тим самим промптом, що й дашборд (categorization.build_categorization_request),
+# відправляє файл у Batch API, чекає завершення і записує результати в кеш категорій.
+# Batch API коштує вдвічі дешевше за синхронні виклики і не займає дашборд.
+#
+# Запуск можна перервати в будь-який момент: стан (файл, batch id) зберігається у
+# backfill_state.json, і повторний запуск продовжить з того ж кроку.
+#
+# Приклади:
+#   python batch_backfill.py fetch --from 2022-02-24 --to 2024-12-31   # завантажити історію в сховище
+#   python batch_backfill.py run                                       # категоризувати все без категорії
+#   python batch_backfill.py status
+#   python batch_backfill.py run --base-url http://localhost:8000/v1   # локальна заглушка замість OpenAI
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timezone
+
+import openai
+
+import video_store
+from boilerplate import load_channel_boilerplate, strip_boilerplate
+from near_duplicates import get_channel_index, video_text
+from categorization import CATEGORIES, PROMPT_VERSION, build_categorization_request, parse_category_response
+from youtube_fetch import CHANNEL_ID, fetch_channel_videos
+from fetch_cache import create_fetch_cache
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+# Batch API приймає до 50 000 запитів і до 200 МБ в одному файлі. Рядок запиту важить 7-11 КБ
+# (промпт з описами категорій і прикладами), тож для довгої історії першим спрацьовує ліміт розміру
+MAX_REQUESTS_PER_BATCH = 50000
+MAX_BATCH_FILE_BYTES = 190 * 1024 * 1024
+TERMINAL_BATCH_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+DEFAULT_STATE_PATH = "backfill_state.json"
+DEFAULT_BATCH_DIR = "batch_files"
+
+
+def load_api_key(name):
+    """Бере ключ зі змінної оточення або з локального config_keys.py (як і app.py)."""
+    value = os.environ.get(name)
+    if value:
+        return value
+    try:
+        import config_keys
+        return getattr(config_keys, name, None)
+    except ImportError:
+        return None
+
+
+def load_state(state_path):
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state_path, state):
+    # Пишемо через тимчасовий файл, щоб переривання не залишило зіпсований стан
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def prepare_batch_file(conn, channel_id, batch_dir, limit, max_bytes=MAX_BATCH_FILE_BYTES):
+    """
+    Записує відео без категорії в JSONL-файл для Batch API, поки файл не перевищує max_bytes.
+    Повертає (шлях, кількість запитів, кількість відео, що не вмістилися і підуть у наступний batch)
+    або (None, 0, 0), якщо записати нічого - порожній файл у Batch API не відправляється.
+    Відео, майже ідентичні вже категоризованим, отримують їхню категорію одразу і в batch не потрапляють.
+    Запит, що сам по собі більший за max_bytes, пропускається - він не вмістився б у жоден файл.
+    """
+    videos = video_store.get_uncategorized_videos(conn, channel_id, PROMPT_VERSION, limit=limit)
+    if not videos:
+        return None, 0, 0
+
+    # Вирізаємо повторюваний підвал каналу - так само, як і дашборд перед синхронним викликом
+    boilerplate_lines = load_channel_boilerplate(conn, channel_id)
+
+    duplicate_index = get_channel_index(conn, channel_id, PROMPT_VERSION, boilerplate_lines)
+    reused_categories = {}
+    for video in videos:
+        match = duplicate_index.find(video_text(video['title'], video['description'], boilerplate_lines))
+        if match:
+            reused_categories[video['id']] = match[1]
+    if reused_categories:
+        video_store.save_categories(conn, reused_categories, PROMPT_VERSION, source="near_duplicate")
+        print(f"Категорію успадковано від схожих відео без запиту до GPT: {len(reused_categories)}")
+    videos = [video for video in videos if video['id'] not in reused_categories]
+    if not videos:
+        return None, 0, 0
+
+    os.makedirs(batch_dir, exist_ok=True)
+    batch_path = os.path.join(batch_dir, f"categorize_{PROMPT_VERSION}_{datetime.now():%Y%m%d_%H%M%S_%f}.jsonl")
+    written_bytes = 0
+    request_count = 0
+    oversized_count = 0
+    with open(batch_path, "wb") as f:
+        for video in videos:
+            line = {
+                "custom_id": video['id'],
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": build_categorization_request(
+                    video['title'], strip_boilerplate(video['description'], boilerplate_lines), CATEGORIES
+                )
+            }
+            encoded = (json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8")
+            if len(encoded) > max_bytes:
+                oversized_count += 1
+                continue
+            if written_bytes + len(encoded) > max_bytes:
+                break
+            f.write(encoded)
+            written_bytes += len(encoded)
+            request_count += 1
+    if oversized_count:
+        print(f"Пропущено відео, запит для яких більший за ліміт розміру файлу: {oversized_count}")
+    if not request_count:
+        os.remove(batch_path)
+        return None, 0, 0
+    return batch_path, request_count, len(videos) - request_count - oversized_count
+
+
+def parse_batch_output(output_text):
+    """
+    Розбирає вихідний JSONL Batch API у словник {video_id: category}. Рядки з помилками та відповіді
+    без вмісту (відмова моделі) пропускаються і рахуються як невдалі - такі відео не отримують "Різне".
+    """
+    categories_by_id = {}
+    failed = 0
+    for raw_line in output_text.splitlines():
+        if not raw_line.strip():
+            continue
+        line = json.loads(raw_line)
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            failed += 1
+            continue
+        content = response["body"]["choices"][0]["message"]["content"]
+        if content is None:
+            failed += 1
+            continue
+        categories_by_id[line["custom_id"]] = parse_category_response(content, CATEGORIES)
+    return categories_by_id, failed
+
+
+def run_backfill(client, conn, channel_id, state_path, batch_dir, limit, poll_interval, wait=True):
+    """
+    Проходить кроки prepare -> submit -> poll -> ingest, зберігаючи стан після кожного.
+    Повертає фінальний стан.
+    """
+    state = load_state(state_path)
+
+    # 1. Підготовка файлу
+    if not state.get("batch_path"):
+        batch_path, request_count, deferred_count = prepare_batch_file(conn, channel_id, batch_dir, limit)
+        if not batch_path:
+            print("Запитів до GPT для відправки немає - batch не створено.")
+            return state
+        state = {
+            "prompt_version": PROMPT_VERSION,
+            "channel_id": channel_id,
+            "batch_path": batch_path,
+            "request_count": request_count,
+            "deferred_count": deferred_count,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        save_state(state_path, state)
+        print(f"Підготовлено {request_count} запитів: {batch_path}")
+        if deferred_count:
+            print(f"Не вмістилися в ліміт розміру файлу і підуть у наступний batch: {deferred_count}")
+    elif state.get("prompt_version") != PROMPT_VERSION:
+        print(f"Увага: незавершений batch створено з промптом {state.get('prompt_version')}, "
+              f"поточна версія {PROMPT_VERSION}. Результати будуть записані під версією з файлу стану.")
+
+    # 2. Завантаження файлу та створення batch
+    if not state.get("input_file_id") and not state.get("request_count"):
+        # Стан із порожнім файлом (наприклад, від старішої версії скрипта) - відправляти нічого
+        print(f"Файл {state['batch_path']} не містить запитів - batch не відправляється, стан скинуто.")
+        os.remove(state_path)
+        return {}
+    if not state.get("input_file_id"):
+        with open(state["batch_path"], "rb") as f:
+            uploaded = client.files.create(file=f, purpose="batch")
+        state["input_file_id"] = uploaded.id
+        save_state(state_path, state)
+
+    if not state.get("batch_id"):
+        batch = client.batches.create(
+            input_file_id=state["input_file_id"],
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+            metadata={"purpose": "ainalitics_backfill", "prompt_version": state["prompt_version"]}
+        )
+        state["batch_id"] = batch.id
+        save_state(state_path, state)
+        print(f"Batch створено: {batch.id}")
+
+    # 3. Очікування завершення
+    while True:
+        batch = client.batches.retrieve(state["batch_id"])
+        state["batch_status"] = batch.status
+        state["output_file_id"] = batch.output_file_id
+        state["error_file_id"] = batch.error_file_id
+        save_state(state_path, state)
+        counts = batch.request_counts
+        progress = f" ({counts.completed}/{counts.total})" if counts else ""
+        print(f"Статус batch {batch.id}: {batch.status}{progress}")
+        if batch.status in TERMINAL_BATCH_STATUSES or not wait:
+            break
+        time.sleep(poll_interval)
+
+    if state["batch_status"] not in TERMINAL_BATCH_STATUSES:
+        return state
+
+    # 4. Запис результатів у кеш категорій
+    categories_by_id, failed = {}, 0
+    if state.get("output_file_id"):
+        output_text = client.files.content(state["output_file_id"]).text
+        categories_by_id, failed = parse_batch_output(output_text)
+        video_store.save_categories(conn, categories_by_id, state["prompt_version"], source="batch")
+    print(f"Записано категорій: {len(categories_by_id)}, помилок: {failed}. "
+          f"Відео з помилками залишаться без категорії і потраплять у наступний запуск.")
+
+    # Очищаємо стан, щоб наступний запуск почав новий batch
+    os.remove(state_path)
+    state["ingested"] = len(categories_by_id)
+    # Решта - відео, що не вмістилися у файл за розміром або понад --limit, і відео з помилками
+    state["remaining_count"] = video_store.count_uncategorized_videos(conn, channel_id, state["prompt_version"])
+    if state["remaining_count"]:
+        print(f"Відео без категорії, що залишилися: {state['remaining_count']}")
+    return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Офлайн-категоризація відео зі сховища через OpenAI Batch API.")
+    parser.add_argument("--db", default=None, help="Шлях до бази сховища (за замовчуванням AINALITICS_DB або ainalitics.db)")
+    parser.add_argument("--channel-id", default=CHANNEL_ID)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fetch_parser = subparsers.add_parser("fetch", help="Завантажити відео каналу за період у сховище")
+    fetch_parser.add_argument("--from", dest="date_from", required=True, type=date.fromisoformat)
+    fetch_parser.add_argument("--to", dest="date_to", required=True, type=date.fromisoformat)
+
+    run_parser = subparsers.add_parser("run", help="Підготувати, відправити, дочекатися та записати batch")
+    run_parser.add_argument("--state", default=DEFAULT_STATE_PATH)
+    run_parser.add_argument("--batch-dir", default=DEFAULT_BATCH_DIR)
+    run_parser.add_argument("--limit", type=int, default=MAX_REQUESTS_PER_BATCH, help="Максимум запитів в одному batch")
+    run_parser.add_argument("--poll-interval", type=float, default=60.0, help="Секунди між перевірками статусу")
+    run_parser.add_argument("--no-wait", action="store_true", help="Перевірити статус один раз і вийти")
+    run_parser.add_argument("--base-url", default=None, help="Альтернативний endpoint (наприклад, локальна заглушка)")
+
+    status_parser = subparsers.add_parser("status", help="Показати стан незавершеного batch")
+    status_parser.add_argument("--state", default=DEFAULT_STATE_PATH)
+
+    args = parser.parse_args(argv)
+    conn = video_store.connect(args.db)
+
+    if args.command == "fetch":
+        youtube_api_key = load_api_key("YOUTUBE_API_KEY")
+        if not youtube_api_key:
+            print("Помилка: YOUTUBE_API_KEY не визначено.", file=sys.stderr)
+            return 1
+        videos = fetch_channel_videos(youtube_api_key, args.channel_id, args.date_from, args.date_to,
+                                      fetch_cache=create_fetch_cache())
+        video_store.upsert_videos(conn, args.channel_id, videos)
+        print(f"Збережено у сховище відео: {len(videos)}")
+        return 0
+
+    if args.command == "status":
+        state = load_state(args.state)
+        print(json.dumps(state, ensure_ascii=False, indent=2) if state else "Незавершеного batch немає.")
+        uncategorized_count = video_store.count_uncategorized_videos(conn, args.channel_id, PROMPT_VERSION)
+        print(f"Відео без категорії ({PROMPT_VERSION}): {uncategorized_count}")
+        return 0
+
+    openai_api_key = load_api_key("OPENAI_API_KEY")
+    if not openai_api_key:
+        print("Помилка: OPENAI_API_KEY не визначено.", file=sys.stderr)
+        return 1
+    client = openai.OpenAI(api_key=openai_api_key, base_url=args.base_url)
+    # Історія, що не вмістилася в один файл, обробляється наступними batch один за одним.
+    # Зупиняємось, коли відео без категорії не лишилось або batch нічого не записав (щоб не зациклитись на помилках)
+    while True:
+        state = run_backfill(
+            client, conn, args.channel_id, args.state, args.batch_dir,
+            limit=min(args.limit, MAX_REQUESTS_PER_BATCH),
+            poll_interval=args.poll_interval,
+            wait=not args.no_wait
+        )
+        if not (state.get("ingested") and state.get("remaining_count")):
+            break
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+# boilerplate.py
+# Виявлення та вирізання повторюваного "підвалу" в описах відео каналу
+# (посилання на соцмережі, реквізити для донатів, хештеги), щоб ліміт опису в промпті
+# категоризації витрачався на змістовний текст, а не на однаковий для всіх відео футер.
+#
+# Повторювані рядки вивчаються по описах відео каналу зі сховища і кешуються там же
+# (таблиця channel_boilerplate), тож навчання відбувається раз на багато запусків.
+
+import re
+from collections import Counter
+
+import video_store
+
+# Рядок вважається шаблонним, якщо трапляється щонайменше в такій частці описів
+MIN_LINE_SHARE = 0.3
+# Менше описів - статистика ненадійна, нічого не вирізаємо
+MIN_DESCRIPTIONS_TO_LEARN = 20
+# Скільки останніх описів каналу брати для навчання
+MAX_DESCRIPTIONS_TO_LEARN = 1000
+# Перевчаємо, коли кількість відео каналу в сховищі зросла на цю частку
+RELEARN_GROWTH_SHARE = 0.2
+
+_URL_RE = re.compile(r"https?://\S+|www\.\S+")
+# Токен-посилання, хештег, @-згадка або токен без літер і цифр (емодзі, розділові знаки)
+_LINK_TOKEN_RE = re.compile(r"^(?:https?://\S+|www\.\S+|[#@]\w+|[^\w]+)$")
+# Довгі числа - номери замовлень, трекінгові id. Короткі числа не маскуємо: рядки на кшталт
+# "Серія 12: ..." чи таймкодів "00:00 Вступ" - змістовні й відрізняються саме числами
+_TRACKING_ID_RE = re.compile(r"\d{6,}")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_line(line):
+    """
+    Нормалізує рядок для порівняння між описами: нижній регістр, посилання та довгі числа
+    замінюються масками (utm-параметр чи трекінговий id не роблять футер унікальним).
+    """
+    line = _URL_RE.sub("<url>", line.strip().lower())
+    line = _TRACKING_ID_RE.sub("0", line)
+    return _SPACES_RE.sub(" ", line)
+
+
+def _is_link_only(line):
+    """Чи складається рядок лише з посилань, хештегів, @-згадок та розділових знаків."""
+    return all(_LINK_TOKEN_RE.match(token) for token in line.split())
+
+
+def learn_boilerplate_lines(descriptions, min_share=MIN_LINE_SHARE):
+    """Повертає множину нормалізованих рядків, що повторюються щонайменше в min_share описів."""
+    descriptions = [d for d in descriptions if d]
+    if len(descriptions) < MIN_DESCRIPTIONS_TO_LEARN:
+        return set()
+
+    line_counts = Counter()
+    for description in descriptions:
+        # Кожен рядок рахуємо один раз на опис
+        line_counts.update({normalize_line(line) for line in description.splitlines() if line.strip()})
+
+    min_count = max(2, int(len(descriptions) * min_share))
+    return {line for line, count in line_counts.items() if count >= min_count}
+
+
+def strip_boilerplate(description, boilerplate_lines):
+    """
+    Вирізає з опису шаблонні рядки та шаблонний хвіст.
+    Хвіст починається з шаблонного рядка і далі містить лише шаблонні рядки або рядки
+    з самих посилань/хештегів - так зникають і змінні посилання всередині футера,
+    а такі ж рядки посеред змістовного тексту залишаються.
+    Якщо після вирізання нічого не лишилось, повертає опис без змін - порожній опис гірший за підвал.
+    """
+    if not description or not boilerplate_lines:
+        return description
+
+    lines = description.splitlines()
+    is_boilerplate = [bool(line.strip()) and normalize_line(line) in boilerplate_lines for line in lines]
+
+    # Ідемо з кінця, поки рядки шаблонні або "лише посилання"
+    footer_start = len(lines)
+    for i in range(len(lines) - 1, -1, -1):
+        if is_boilerplate[i]:
+            footer_start = i
+        elif lines[i].strip() and not _is_link_only(lines[i]):
+            break
+
+    kept_lines = [line for line, boilerplate in zip(lines[:footer_start], is_boilerplate) if not boilerplate]
+    return "\n".join(kept_lines).strip() or description
+
+
+def load_channel_boilerplate(conn, channel_id):
+    """
+    Повертає шаблонні рядки каналу з кешу у сховищі.
+    Якщо кешу немає або відео каналу в сховищі суттєво побільшало - перевчає і оновлює кеш.
+    """
+    video_count = video_store.count_channel_videos(conn, channel_id)
+    cached = video_store.get_channel_boilerplate(conn, channel_id)
+    if cached and video_count <= cached['video_count'] * (1 + RELEARN_GROWTH_SHARE):
+        return cached['lines']
+
+    descriptions = video_store.get_channel_descriptions(conn, channel_id, limit=MAX_DESCRIPTIONS_TO_LEARN)
+    lines = learn_boilerplate_lines(descriptions)
+    if len(descriptions) >= MIN_DESCRIPTIONS_TO_LEARN:
+        video_store.save_channel_boilerplate(conn, channel_id, lines, video_count)
+    return lines
@@ -0,0 +1,189 @@
+# categorization.py
+# Спільна логіка категоризації відео: список категорій, побудова промпту та розбір відповіді GPT.
+# Використовується і в app.py (синхронні виклики), і в batch_backfill.py (Batch API),
+# щоб обидва режими надсилали ОДНАКОВИЙ промпт і кешували результати під однією версією.
+#
+# Модель відповідає не повною назвою категорії, а коротким кодом ("1", "2", ...), а формат
+# відповіді обмежено JSON-схемою з enum кодів (structured outputs). Це зменшує кількість
+# вихідних токенів і дає однозначне зіставлення код -> категорія через словник.
+
+import json
+from functools import lru_cache
+
+# Модель і параметри для категоризації
+CATEGORIZATION_MODEL = "gpt-4o-mini"
+# Відповідь має вигляд {"code": "11"} - кілька токенів
+CATEGORIZATION_MAX_TOKENS = 10
+
+# Версія промпту категоризації. Змінюй її, якщо змінився список категорій або інструкції,
+# щоб старі закешовані категорії в сховищі не змішувалися з новими.
+PROMPT_VERSION = "v2"
+
+# Ліміт опису, який потрапляє в промпт
+DESCRIPTION_SNIPPET_CHARS = 1500
+
+# Визначені категорії для аналізу
+CATEGORIES = [
+    "Танки",  # Про танки, їх бойове застосування
+    "Артилерія",  # Про артилерійські системи, РСЗВ, міномети
+    "Авіація",  # Про літаки, гелікоптери, повітряні бої, ППО по авіації
+    "Бронетехніка",  # Про БМП, БТР, іншу легку/середню бронетехніку (крім танків)
+    "Дрони",  # Про розвідувальні та ударні БПЛА, FPV-дрони, РЕБ проти дронів
+    "Піхота і гарячі напрямки",  # Про дії піхоти, штурми, бої в містах, репортажі з фронту
+    "Героїзм та унікальні історії військових, портретні репортажі", # Інтерв'ю, історії подвигів
+    "Навчання",  # Навчальні відео, інструкції, тактична медицина, тренування
+    "Огляди зразків озброєння",  # Огляди стрілецької зброї, гранатометів, ПТРК
+    "Новини, Стріми, Аналітика", # Зведення новин, стріми з фронту, аналітичні огляди (НОВА)
+    "Різне" # Для всього іншого, що не підходить
+]
+
+# Словник з описами категорій (АДАПТУЙ ПІД СВІЙ ФІНАЛЬНИЙ СПИСОК CATEGORIES)
+# Це має точно відповідати твоїм категоріям у списку CATEGORIES
+CATEGORY_INSTRUCTIONS = {
+    "Танки": "Відео про танки (напр., Т-64, Leopard, Abrams), їх модифікації, бойове застосування, огляди, порівняння, танкові бої, знищення ворожих танків.",
+    "Артилерія": "Відео про артилерійські системи (гаубиці, САУ як PzH 2000, Caesar, РСЗВ як HIMARS, Grad, міномети), їхню роботу, боєприпаси, тактику застосування.",
+    "Авіація": "Відео про військові літаки (напр., Су-25, МіГ-29, F-16), гелікоптери (Мі-8, Мі-24, Apache), повітряні бої, роботу ППО по авіації ворога.",
+    "Бронетехніка": "Відео про броньовані машини піхоти (БМП), бронетранспортери (БТР як M113, Stryker), бойові розвідувальні машини, MRAP та іншу легку і середню бронетехніку (окрім танків).",
+    "Дрони": "Відео про розвідувальні та ударні безпілотники (БПЛА), FPV-дрони, їх розробку, виробництво, застосування для розвідки та ураження цілей, боротьбу з ворожими дронами (РЕБ). Включно з аналізом еволюції БПЛА.",
+    "Піхота і гарячі напрямки": "Відео про дії піхотних підрозділів, штурмові операції, бої в містах та на відкритій місцевості, репортажі з передової, тактику піхоти, аналіз бойових дій на конкретних гарячих напрямках (напр., Бахмут, Авдіївка). Включно з відео про роботу снайперів у складі піхотних груп.",
+    "Героїзм та унікальні історії військових, портретні репортажі": "Інтерв'ю з військовослужбовцями ЗСУ, розповіді про їхній особистий бойовий шлях, проявлений героїзм, унікальні подвиги, досвід перебування в полоні, реабілітацію після поранень, мотиваційні сюжети про конкретних бійців, їхні думки та почуття. Включно з історіями про волонтерів, медиків на фронті.",
+    "Навчання": "Навчальні відео, інструкції з використання зброї та техніки, тактичної медицини (напр., накладання турнікету), військової підготовки, розбір тактичних прийомів, тренування бійців, поради щодо виживання.",
+    "Огляди зразків озброєння": "Детальні огляди конкретних моделей стрілецької зброї (автомати, кулемети, гвинтівки), гранатометів, ПТРК, ПЗРК, їхні технічні характеристики, переваги та недоліки, поради щодо вибору та використання. Також сюди відносяться огляди іншого спорядження, наприклад, сухпайків.",
+    "Новини, Стріми, Аналітика": "Щоденні або щотижневі зведення новин з фронту та навколовоєнної ситуації, прямі трансляції (стріми) з обговоренням актуальних подій, аналітичні огляди воєнно-політичної ситуації, підсумки тижня, обговорення міжнародної допомоги, заяв офіційних осіб.",
+    "Різне": "Відео, які не підпадають чітко під жодну з перерахованих вище категорій." # Базовий опис для "Різне"
+}
+
+# Приклади для Few-shot learning (адаптуй за потреби): (назва відео, категорія, примітка)
+PROMPT_EXAMPLES = [
+    ("Неймовірний бій Leopard 2 проти Т-90", "Танки", ""),
+    ("Як працює HIMARS: детальний розбір", "Артилерія", ""),
+    ("Історія пілота Су-25, який виконав 100 бойових вильотів", "Героїзм та унікальні історії військових, портретні репортажі", ""),
+    ("FPV-дрон знищує ворожий склад боєприпасів", "Дрони", ""),
+    ("Стрім з Бахмута: останні новини з передової", "Новини, Стріми, Аналітика", ""),
+    ("Огляд автомата АК-74: переваги та недоліки", "Огляди зразків озброєння", ""),
+    ("Перша допомога при кульовому пораненні: інструкція", "Навчання", ""),
+    ("Чому не можна з'єднувати магазини скотчем?", "Навчання", "або Огляди зразків озброєння, якщо фокус на зброї"),
+]
+
+SYSTEM_PROMPT = "Ти експерт-класифікатор відеоконтенту військової тематики. Твоя відповідь – це ТІЛЬКИ код однієї категорії зі списку доступних категорій у форматі JSON."
+
+
+def get_default_other_category(categories_list):
+    """Повертає назву категорії "Різне" (або останню категорію списку, якщо "Різне" відсутня)."""
+    default_other_category = "Різне"
+    if default_other_category not in categories_list:
+        if categories_list: # Якщо список не порожній, беремо останню категорію як "Різне"
+            return categories_list[-1]
+        return None # Список категорій порожній
+    return default_other_category
+
+
+@lru_cache(maxsize=None)
+def _category_codes(categories):
+    """Коди категорій ("1", "2", ...) для кортежу categories: (код -> категорія, категорія -> код)."""
+    code_to_category = {str(i + 1): cat_name for i, cat_name in enumerate(categories)}
+    return code_to_category, {cat_name: code for code, cat_name in code_to_category.items()}
+
+
+def get_code_to_category(categories_list):
+    """Словник код -> назва категорії (обчислюється один раз для кожного списку категорій)."""
+    return _category_codes(tuple(categories_list))[0]
+
+
+def build_response_format(categories_list):
+    """JSON-схема відповіді: єдине поле "code" з enum допустимих кодів."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "video_category",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {"code": {"type": "string", "enum": list(get_code_to_category(categories_list))}},
+                "required": ["code"],
+                "additionalProperties": False
+            }
+        }
+    }
+
+
+def build_categorization_request(title, description, categories_list, description_chars=DESCRIPTION_SNIPPET_CHARS):
+    """
+    Формує тіло запиту до Chat Completions для категоризації одного відео.
+    Той самий словник передається в openai.chat.completions.create(**body)
+    і записується як "body" рядка JSONL-файлу для Batch API.
+    description_chars - ліміт опису в промпті (інші значення порівнює categorization_benchmark.py).
+    """
+    default_other_category = get_default_other_category(categories_list)
+    category_to_code = _category_codes(tuple(categories_list))[1]
+    description_snippet = description[:description_chars] if description else "" # Ліміт опису
+
+    # Формуємо частину промпту з інструкціями, базуючись на categories_list
+    instructions_for_prompt = "Описи категорій (код - назва: опис), з яких потрібно вибрати ОДНУ:\n"
+    for cat_name in categories_list:
+        cat_description = CATEGORY_INSTRUCTIONS.get(cat_name)
+        if cat_description is None and cat_name == default_other_category: # Якщо це "Різне" і його немає в інструкціях
+            cat_description = 'Відео, які не підпадають під жодну з перерахованих вище категорій.'
+        if cat_description is not None:
+            instructions_for_prompt += f"- {category_to_code[cat_name]} - **{cat_name}**: {cat_description}\n"
+
+    examples_for_prompt = "Ось кілька прикладів правильної категоризації:\n"
+    for i, (example_title, example_category, example_note) in enumerate(
+            (example for example in PROMPT_EXAMPLES if example[1] in category_to_code), start=1):
+        note = f" ({example_note})" if example_note else ""
+        examples_for_prompt += (f'{i}. Назва: "{example_title}" -> Код: {category_to_code[example_category]} '
+                                f'({example_category}){note}\n')
+
+    prompt = f"""
+Тебе просять виступити в ролі експерта, який категоризує відео для YouTube-каналу "Армія TV" військової тематики.
+Твоє завдання – проаналізувати НАЗВУ та ОПИС відео і віднести його до ОДНІЄЇ найбільш підходящої категорії з наданого списку.
+Уважно прочитай описи кожної категорії та приклади, щоб зробити правильний вибір.
+
+{instructions_for_prompt}
+
+{examples_for_prompt}
+
+Тепер проаналізуй наступне відео:
+Назва відео: "{title}"
+Опис відео (фрагмент): "{description_snippet}"
+
+Поверни ТІЛЬКИ код обраної категорії у форматі {{"code": "<код>"}}.
+"""
+    return {
+        "model": CATEGORIZATION_MODEL,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": CATEGORIZATION_MAX_TOKENS,
+        "temperature": 0.0,
+        "response_format": build_response_format(categories_list)
+    }
+
+
+def parse_category_response(category_response, categories_list):
+    """
+    Зіставляє відповідь GPT ({"code": "N"}) з назвою категорії через словник кодів.
+    Для сумісності з відповідями у старому форматі приймається і голий код, і точна назва категорії.
+    Якщо нічого не підійшло, повертає категорію "Різне".
+    """
+    code_to_category = get_code_to_category(categories_list)
+    category_response = (category_response or "").strip()
+
+    try:
+        parsed = json.loads(category_response)
+        code = str(parsed.get("code", "")).strip() if isinstance(parsed, dict) else str(parsed)
+    except ValueError:
+        code = category_response.strip("\"'. ")
+
+    if code in code_to_category:
+        return code_to_category[code]
+
+    # Відповідь у старому форматі (повна назва, можливо з префіксом "Категорія:")
+    name = code.split(":")[-1].strip().lower()
+    return _category_names_lower(tuple(categories_list)).get(name, get_default_other_category(categories_list))
+
+
+@lru_cache(maxsize=None)
+def _category_names_lower(categories):
+    return {cat_name.lower(): cat_name for cat_name in categories}
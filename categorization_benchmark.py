@@ -0,0 +1,373 @@
+# categorization_benchmark.py
+# Порівняння конфігурацій категоризації (модель, ліміт опису, вирізання підвалу) за точністю та ціною
+# на еталонному наборі відео "Армія TV", розміченому вручну.
+#
+# Еталонний набір - JSON-файл з версією та списком категорій, під який його розмічено:
+#   {"version": "v1", "prompt_version": "v2", "categories": [...],
+#    "videos": [{"id", "title", "description", "stripped_description", "published_at", "views", "label"}, ...]}
+# Заготовку для розмітки (відео зі сховища, "label": null) створює команда export-template;
+# відео без мітки під час прогону пропускаються. Мітки ставить людина - скрипт їх не вигадує.
+# stripped_description - опис без підвалу каналу, вирізаний під час експорту: шаблонні рядки в сховищі
+# перевчаються з ростом каналу, а промпти бенчмарку будуються лише з файлу набору, щоб касети не застарівали.
+#
+# Відповіді моделі записуються в "касету" (JSONL поруч із набором) разом із затримкою та токенами,
+# а в режимі replay беруться з неї - прогін відтворюваний, офлайн і безкоштовний. Ключ запису - хеш
+# тіла запиту, тож зміна промпту чи моделі вимагає нового запису (record), а не дає старих відповідей.
+# Режим stub використовує детерміновану заглушку з local_openai_stub.py для перевірки самого конвеєра.
+#
+# Запуск:
+#   python categorization_benchmark.py export-template --size 300 --output golden/armytv_v1.json
+#   python categorization_benchmark.py run --golden golden/armytv_v1.json --mode record
+#   python categorization_benchmark.py run --golden golden/armytv_v1.json --config baseline --config title_only
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import date
+
+import openai
+import pandas as pd
+
+import video_store
+from batch_backfill import load_api_key
+from boilerplate import load_channel_boilerplate, strip_boilerplate
+from categorization import (
+    CATEGORIES, CATEGORIZATION_MODEL, DESCRIPTION_SNIPPET_CHARS, PROMPT_VERSION,
+    build_categorization_request, get_code_to_category, get_default_other_category, parse_category_response
+)
+from sampling import draw_stratified_sample
+from youtube_fetch import CHANNEL_ID
+
+# Конфігурації, що порівнюються. baseline - поточні налаштування дашборду і batch_backfill.py
+BENCHMARK_CONFIGS = {
+    "baseline": {'model': CATEGORIZATION_MODEL, 'description_chars': DESCRIPTION_SNIPPET_CHARS,
+                 'strip_boilerplate': True},
+    "short_description": {'model': CATEGORIZATION_MODEL, 'description_chars': 300, 'strip_boilerplate': True},
+    "title_only": {'model': CATEGORIZATION_MODEL, 'description_chars': 0, 'strip_boilerplate': True},
+    "no_boilerplate_strip": {'model': CATEGORIZATION_MODEL, 'description_chars': DESCRIPTION_SNIPPET_CHARS,
+                             'strip_boilerplate': False},
+    "nano": {'model': "gpt-4.1-nano", 'description_chars': DESCRIPTION_SNIPPET_CHARS, 'strip_boilerplate': True},
+}
+
+# Ціни OpenAI, USD за 1M токенів (вхідні, вихідні). Batch API коштує вдвічі дешевше.
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4o": (2.50, 10.00),
+}
+BATCH_DISCOUNT = 0.5
+
+LATENCY_PERCENTILES = (50, 90, 99)
+MODES = ("replay", "record", "live", "stub")
+
+
+def load_golden_set(path):
+    """
+    Читає еталонний набір і перевіряє його: список категорій має збігатися з categorization.CATEGORIES,
+    мітки - бути з цього списку. Повертає (набір, розмічені відео).
+    """
+    with open(path, encoding="utf-8") as f:
+        golden = json.load(f)
+    if not golden.get('version'):
+        raise ValueError(f"{path}: не вказано версію еталонного набору")
+    if golden.get('categories') != CATEGORIES:
+        raise ValueError(f"{path}: набір розмічено під інший список категорій - оновіть розмітку та версію набору")
+    labelled = []
+    for video in golden.get('videos', []):
+        if video.get('label') is None:
+            continue
+        if video['label'] not in CATEGORIES:
+            raise ValueError(f"{path}: невідома категорія '{video['label']}' у відео {video['id']}")
+        if 'stripped_description' not in video:
+            raise ValueError(f"{path}: у відео {video['id']} немає stripped_description - "
+                             f"набір експортовано старішою версією скрипта, експортуйте його заново")
+        labelled.append(video)
+    return golden, labelled
+
+
+def export_golden_template(conn, channel_id, size, version, date_from=None, date_to=None):
+    """
+    Заготовка еталонного набору: стратифікована вибірка відео каналу зі сховища (місяць x дециль
+    переглядів, як у режимі оцінки), щоб у набір потрапили і старі, і нові, і популярні, і непопулярні відео.
+    Опис кожного відео зберігається і повністю, і без підвалу каналу, вивченого по сховищу на момент експорту.
+    """
+    videos = video_store.get_channel_videos(conn, channel_id, date_from, date_to)
+    sample, _, _ = draw_stratified_sample(videos, size)
+    boilerplate_lines = load_channel_boilerplate(conn, channel_id)
+    return {
+        'version': version,
+        'prompt_version': PROMPT_VERSION,
+        'channel_id': channel_id,
+        'categories': CATEGORIES,
+        'videos': [
+            {'id': video['id'], 'title': video['title'], 'description': video['description'] or "",
+             'stripped_description': strip_boilerplate(video['description'] or "", boilerplate_lines),
+             'published_at': video['published_at'], 'views': video['views'], 'label': None}
+            for video in sorted(sample, key=lambda video: video['published_at'])
+        ],
+    }
+
+
+def request_key(body):
+    """Ключ запису касети - хеш канонічного JSON тіла запиту."""
+    return hashlib.sha256(json.dumps(body, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class CassetteModel:
+    """
+    Джерело відповідей Chat Completions для бенчмарку.
+    live - реальний API; record - реальний API із записом у касету; replay - лише з касети
+    (затримка береться записана, щоб перцентилі не залежали від машини); stub - local_openai_stub.
+    complete(body) повертає (відповідь як словник, затримка в секундах).
+    """
+
+    def __init__(self, mode, cassette_path, client=None):
+        self.mode = mode
+        self.cassette_path = cassette_path
+        self.client = client
+        self.recorded = {}
+        self.missing = 0
+        if mode in ("replay", "record") and os.path.exists(cassette_path):
+            with open(cassette_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.recorded[entry['key']] = entry
+
+    def complete(self, body):
+        key = request_key(body)
+        if self.mode in ("replay", "record") and key in self.recorded:
+            entry = self.recorded[key]
+            return entry['response'], entry['latency_seconds']
+        if self.mode == "replay":
+            self.missing += 1
+            raise KeyError(f"Запиту немає в касеті {self.cassette_path} - запишіть його з --mode record")
+
+        started = time.perf_counter()
+        if self.mode == "stub":
+            from local_openai_stub import stub_chat_completion
+            response = stub_chat_completion(body)
+        else:
+            response = self.client.chat.completions.create(**body).model_dump(mode="json")
+        latency = time.perf_counter() - started
+
+        if self.mode == "record":
+            entry = {'key': key, 'model': body['model'], 'response': response, 'latency_seconds': latency}
+            self.recorded[key] = entry
+            with open(self.cassette_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return response, latency
+
+
+def run_config(config, videos, model):
+    """Категоризує відео набору однією конфігурацією. Повертає рядки з міткою, відповіддю, затримкою й токенами."""
+    default_other_category = get_default_other_category(CATEGORIES)
+    rows = []
+    for video in videos:
+        description = video['stripped_description'] if config['strip_boilerplate'] else video.get('description')
+        body = build_categorization_request(video['title'], description or "", CATEGORIES,
+                                            description_chars=config['description_chars'])
+        body['model'] = config['model']
+        row = {'id': video['id'], 'label': video['label'], 'predicted': default_other_category, 'error': None,
+               'latency_seconds': None, 'prompt_tokens': 0, 'completion_tokens': 0}
+        try:
+            response, row['latency_seconds'] = model.complete(body)
+            row['predicted'] = parse_category_response(response['choices'][0]['message']['content'], CATEGORIES)
+            usage = response.get('usage') or {}
+            row['prompt_tokens'] = usage.get('prompt_tokens') or 0
+            row['completion_tokens'] = usage.get('completion_tokens') or 0
+        except Exception as e:
+            # Як і в дашборді, відео з помилкою отримує "Різне" - це теж рахується як помилка точності
+            row['error'] = str(e)
+        rows.append(row)
+    return rows
+
+
+def per_category_metrics(rows):
+    """Precision, recall, F1 і кількість відео (support) по кожній категорії."""
+    metrics = []
+    for category in CATEGORIES:
+        true_positive = sum(1 for row in rows if row['label'] == category and row['predicted'] == category)
+        predicted = sum(1 for row in rows if row['predicted'] == category)
+        support = sum(1 for row in rows if row['label'] == category)
+        precision = true_positive / predicted if predicted else 0.0
+        recall = true_positive / support if support else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        metrics.append({'category': category, 'precision': precision, 'recall': recall, 'f1': f1,
+                        'support': support, 'predicted': predicted})
+    return pd.DataFrame(metrics)
+
+
+def confusion_matrix(rows):
+    """Матриця помилок: рядки - еталонна категорія, стовпці - передбачена."""
+    matrix = pd.crosstab(
+        pd.Categorical([row['label'] for row in rows], categories=CATEGORIES),
+        pd.Categorical([row['predicted'] for row in rows], categories=CATEGORIES),
+        rownames=["еталон"], colnames=["передбачено"], dropna=False
+    )
+    return matrix
+
+
+def summarize_config(name, config, rows):
+    """Зведені показники конфігурації: точність, макро-F1, перцентилі затримки, токени й вартість."""
+    answered = [row for row in rows if row['error'] is None]
+    latencies = pd.Series([row['latency_seconds'] for row in answered], dtype=float)
+    prompt_tokens = sum(row['prompt_tokens'] for row in rows)
+    completion_tokens = sum(row['completion_tokens'] for row in rows)
+    input_price, output_price = MODEL_PRICES.get(config['model'], (None, None))
+    cost = None
+    if input_price is not None:
+        cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    metrics = per_category_metrics(rows)
+    summary = {
+        'config': name,
+        'model': config['model'],
+        'description_chars': config['description_chars'],
+        'strip_boilerplate': config['strip_boilerplate'],
+        'videos': len(rows),
+        'errors': len(rows) - len(answered),
+        'accuracy': sum(1 for row in rows if row['label'] == row['predicted']) / len(rows) if rows else 0.0,
+        'macro_f1': float(metrics.loc[metrics['support'] > 0, 'f1'].mean()) if rows else 0.0,
+        'prompt_tokens_per_video': prompt_tokens / len(rows) if rows else 0.0,
+        'completion_tokens_per_video': completion_tokens / len(rows) if rows else 0.0,
+        'cost_usd': cost,
+        'cost_per_1000_videos_usd': cost / len(rows) * 1000 if cost is not None and rows else None,
+        'batch_cost_per_1000_videos_usd': (cost / len(rows) * 1000 * BATCH_DISCOUNT
+                                           if cost is not None and rows else None),
+    }
+    for percentile in LATENCY_PERCENTILES:
+        summary[f'latency_p{percentile}_ms'] = (float(latencies.quantile(percentile / 100)) * 1000
+                                                if not latencies.empty else None)
+    return summary, metrics
+
+
+def run_benchmark(golden_path, config_names, mode, cassette_path=None, limit=None, base_url=None):
+    """
+    Проганяє обрані конфігурації на еталонному наборі. Промпти будуються лише з файлу набору,
+    без звернень до сховища. Повертає словник результатів:
+    {'golden_version', 'mode', 'configs': [{'summary', 'metrics', 'confusion', 'rows'}]}.
+    """
+    golden, videos = load_golden_set(golden_path)
+    if limit:
+        videos = videos[:limit]
+    cassette_path = cassette_path or os.path.splitext(golden_path)[0] + ".cassette.jsonl"
+    client = None
+    if mode in ("record", "live"):
+        client = openai.OpenAI(api_key=load_api_key("OPENAI_API_KEY"), base_url=base_url)
+    model = CassetteModel(mode, cassette_path, client)
+
+    results = {'golden_version': golden['version'], 'mode': mode, 'cassette': cassette_path, 'configs': []}
+    for name in config_names:
+        config = BENCHMARK_CONFIGS[name]
+        rows = run_config(config, videos, model)
+        summary, metrics = summarize_config(name, config, rows)
+        results['configs'].append({'summary': summary, 'metrics': metrics, 'confusion': confusion_matrix(rows),
+                                   'rows': rows})
+    results['missing_in_cassette'] = model.missing
+    return results
+
+
+def print_results(results):
+    print(f"Еталонний набір: {results['golden_version']}, режим: {results['mode']}, касета: {results['cassette']}")
+    summaries = pd.DataFrame([config['summary'] for config in results['configs']])
+    with pd.option_context("display.max_columns", None, "display.width", 200, "display.float_format", "{:.4g}".format):
+        print("\nЗведення конфігурацій:")
+        print(summaries.set_index('config').T.to_string())
+        for config in results['configs']:
+            print(f"\n=== {config['summary']['config']}: precision / recall по категоріях ===")
+            print(config['metrics'].set_index(config['metrics'].index + 1).to_string())
+            # Стовпці підписані кодами категорій (як у промпті), інакше таблиця не вміщається в термінал
+            category_to_code = {category: code for code, category in get_code_to_category(CATEGORIES).items()}
+            print(f"\n=== {config['summary']['config']}: матриця помилок (стовпці - коди категорій) ===")
+            print(config['confusion'].rename(columns=category_to_code).to_string())
+
+
+def results_to_json(results):
+    """JSON-сумісна форма результатів (для збереження та порівняння між версіями)."""
+    return {
+        **{key: value for key, value in results.items() if key != 'configs'},
+        'configs': [
+            {
+                'summary': config['summary'],
+                'metrics': config['metrics'].to_dict(orient='records'),
+                'confusion': {label: row.to_dict() for label, row in config['confusion'].iterrows()},
+                'rows': config['rows'],
+            }
+            for config in results['configs']
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк точності та вартості категоризації на еталонному наборі.")
+    parser.add_argument("--db", default=None, help="Шлях до бази сховища (за замовчуванням AINALITICS_DB або ainalitics.db)")
+    parser.add_argument("--channel-id", default=CHANNEL_ID)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    template_parser = subparsers.add_parser("export-template", help="Створити заготовку еталонного набору для розмітки")
+    template_parser.add_argument("--size", type=int, default=300)
+    template_parser.add_argument("--version", default="v1")
+    template_parser.add_argument("--from", dest="date_from", type=date.fromisoformat, default=None)
+    template_parser.add_argument("--to", dest="date_to", type=date.fromisoformat, default=None)
+    template_parser.add_argument("--output", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Прогнати конфігурації на еталонному наборі")
+    run_parser.add_argument("--golden", required=True, help="Файл еталонного набору (JSON)")
+    run_parser.add_argument("--config", action="append", choices=sorted(BENCHMARK_CONFIGS),
+                            help="Конфігурація (можна кілька разів; за замовчуванням - усі)")
+    run_parser.add_argument("--mode", choices=MODES, default="replay",
+                            help="replay - лише з касети (за замовчуванням), record - API із записом, live - API, stub - заглушка")
+    run_parser.add_argument("--cassette", default=None, help="Файл касети (за замовчуванням <набір>.cassette.jsonl)")
+    run_parser.add_argument("--limit", type=int, default=None, help="Лише перші N розмічених відео")
+    run_parser.add_argument("--base-url", default=None, help="Альтернативний endpoint (наприклад, локальна заглушка)")
+    run_parser.add_argument("--output", default=None, help="Зберегти результати (JSON)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export-template":
+        conn = video_store.connect(args.db)
+        template = export_golden_template(conn, args.channel_id, args.size, args.version, args.date_from, args.date_to)
+        if not template['videos']:
+            print("Помилка: у сховищі немає відео каналу - спершу завантажте їх (batch_backfill.py fetch).",
+                  file=sys.stderr)
+            return 1
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(template, f, ensure_ascii=False, indent=2)
+        print(f"Заготовку збережено: {args.output} (відео: {len(template['videos'])}). "
+              f"Проставте 'label' кожному відео - назву категорії зі списку 'categories'.")
+        return 0
+
+    if args.mode in ("record", "live") and not load_api_key("OPENAI_API_KEY"):
+        print("Помилка: OPENAI_API_KEY не визначено.", file=sys.stderr)
+        return 1
+    try:
+        results = run_benchmark(
+            args.golden, args.config or list(BENCHMARK_CONFIGS), args.mode, args.cassette,
+            limit=args.limit, base_url=args.base_url
+        )
+    except ValueError as e:
+        print(f"Помилка: {e}", file=sys.stderr)
+        return 1
+    if not results['configs'] or not results['configs'][0]['rows']:
+        print("Помилка: в еталонному наборі немає розмічених відео.", file=sys.stderr)
+        return 1
+    if results['missing_in_cassette']:
+        # Без частини відповідей метрики не порівнювані з попередніми прогонами
+        print(f"Помилка: запитів немає в касеті: {results['missing_in_cassette']}. Промпт або конфігурація змінилися - "
+              f"запишіть відповіді з --mode record.", file=sys.stderr)
+        return 1
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results_to_json(results), f, ensure_ascii=False, indent=2, default=str)
+        print(f"\nРезультати збережено: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
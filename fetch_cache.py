@@ -0,0 +1,224 @@
+# fetch_cache.py
+# Спільний (між процесами та репліками Streamlit) кеш сирих відповідей YouTube Data API.
+#
+# st.cache_data живе в пам'яті одного процесу, тому кожна репліка і кожен перезапуск
+# завантажували ті самі відповіді заново. Тут відповіді зберігаються у спільному бекенді
+# (файл SQLite або Redis-сумісний сервер) разом з ETag. Після закінчення TTL запит повторюється
+# з заголовком If-None-Match, і незмінена відповідь повертається як 304 без тіла.
+# Одночасні запити однакового ключа з різних реплік об'єднуються: запит виконує лише власник
+# короткого "замка", решта чекає на його результат.
+#
+# Бекенд обирається змінною оточення AINALITICS_FETCH_CACHE:
+#   sqlite:///fetch_cache.db (за замовчуванням) | redis://localhost:6379/0 | none
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+from googleapiclient.errors import HttpError
+
+from tracing import incr, span
+
+DEFAULT_FETCH_CACHE_URL = os.environ.get("AINALITICS_FETCH_CACHE", "sqlite:///fetch_cache.db")
+# Через скільки секунд відповідь треба перевірити на актуальність (як раніше st.cache_data(ttl=3600))
+DEFAULT_TTL_SECONDS = 3600
+# Скільки живе замок на завантаження (якщо власник "впав", замок звільниться сам)
+LOCK_LEASE_SECONDS = 30
+# Скільки чекати на результат іншої репліки, перш ніж завантажити самостійно
+COALESCE_WAIT_SECONDS = 30
+COALESCE_POLL_SECONDS = 0.2
+# Скільки прострочений запис ще зберігається для ревалідації за ETag, перш ніж його буде видалено
+STALE_RETENTION_SECONDS = 24 * 3600
+# Як часто SQLite-бекенд видаляє застарілі записи і замки
+PRUNE_INTERVAL_SECONDS = 600
+
+# API-ключ не повинен потрапляти в ключ кешу
+_API_KEY_PARAM_RE = re.compile(r"([?&])key=[^&]*&?")
+
+
+class SQLiteFetchCache:
+    """Кеш відповідей у спільному файлі SQLite (підходить для кількох процесів на одній машині/томі)."""
+
+    def __init__(self, path):
+        self.path = path
+        # Одне з'єднання використовують кілька потоків (сесії Streamlit, потік підвантаження сторінок),
+        # тож кожне звернення до нього йде під замком - інакше запис іншого потоку потрапив би
+        # всередину транзакції acquire_lock і закомітився або відкотився б разом з нею
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS fetch_cache (
+                key TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                etag TEXT,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS fetch_locks (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+        """)
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, expires_at FROM fetch_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"body": row[0], "etag": row[1], "expires_at": row[2]}
+
+    def set(self, key, body, etag, ttl):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fetch_cache (key, body, etag, expires_at) VALUES (?, ?, ?, ?)",
+                (key, body, etag, now + ttl)
+            )
+            if now - self._last_prune > PRUNE_INTERVAL_SECONDS:
+                self._prune(now)
+
+    def _prune(self, now):
+        """Видаляє записи, прострочені довше за STALE_RETENTION_SECONDS, і замки "впалих" власників."""
+        self._conn.execute("DELETE FROM fetch_cache WHERE expires_at < ?", (now - STALE_RETENTION_SECONDS,))
+        self._conn.execute("DELETE FROM fetch_locks WHERE expires_at < ?", (now,))
+        self._last_prune = now
+
+    def touch(self, key, ttl):
+        with self._lock:
+            self._conn.execute("UPDATE fetch_cache SET expires_at = ? WHERE key = ?", (time.time() + ttl, key))
+
+    def acquire_lock(self, key, owner, lease=LOCK_LEASE_SECONDS):
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE блокує запис для інших процесів, тож прострочений замок забирає лише один
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM fetch_locks WHERE key = ? AND expires_at < ?", (key, now))
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO fetch_locks (key, owner, expires_at) VALUES (?, ?, ?)",
+                    (key, owner, now + lease)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return cursor.rowcount == 1
+
+    def release_lock(self, key, owner):
+        with self._lock:
+            self._conn.execute("DELETE FROM fetch_locks WHERE key = ? AND owner = ?", (key, owner))
+
+
+class RedisFetchCache:
+    """Кеш відповідей у Redis (або сумісному сервері) - для реплік на різних машинах."""
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Для бекенду redis:// встановіть пакет redis (pip install redis).")
+        self._redis = redis.Redis.from_url(url)
+        self._prefix = "ainalitics:fetch:"
+
+    def get(self, key):
+        raw = self._redis.get(self._prefix + key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key, body, etag, ttl):
+        # Сам запис живе довше за TTL, щоб після закінчення TTL його можна було ревалідувати за ETag
+        entry = {"body": body, "etag": etag, "expires_at": time.time() + ttl}
+        self._redis.set(self._prefix + key, json.dumps(entry), ex=int(ttl + STALE_RETENTION_SECONDS))
+
+    def touch(self, key, ttl):
+        entry = self.get(key)
+        if entry:
+            self.set(key, entry["body"], entry["etag"], ttl)
+
+    def acquire_lock(self, key, owner, lease=LOCK_LEASE_SECONDS):
+        return bool(self._redis.set(self._prefix + "lock:" + key, owner, nx=True, ex=lease))
+
+    def release_lock(self, key, owner):
+        lock_key = self._prefix + "lock:" + key
+        if self._redis.get(lock_key) == owner.encode():
+            self._redis.delete(lock_key)
+
+
+def create_fetch_cache(url=DEFAULT_FETCH_CACHE_URL):
+    """Створює бекенд кешу за URL (sqlite:///шлях, redis://..., none). Для "none" повертає None."""
+    if not url or url == "none":
+        return None
+    if url.startswith("sqlite:///"):
+        return SQLiteFetchCache(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisFetchCache(url)
+    raise ValueError(f"Невідомий бекенд кешу відповідей: {url}")
+
+
+def request_cache_key(request):
+    """Ключ кешу для запиту googleapiclient: метод + URI без API-ключа."""
+    uri = _API_KEY_PARAM_RE.sub(r"\1", request.uri).rstrip("?&")
+    return hashlib.sha256(f"{request.method} {uri}".encode("utf-8")).hexdigest()
+
+
+def _execute_with_headers(request):
+    """Виконує запит і повертає (тіло відповіді, ETag із заголовків або тіла)."""
+    original_postproc = request.postproc
+    request.postproc = lambda resp, content: (resp, original_postproc(resp, content))
+    resp, body = request.execute()
+    return body, resp.get("etag") or body.get("etag")
+
+
+def cached_execute(request, cache, ttl=DEFAULT_TTL_SECONDS):
+    """
+    Виконує запит googleapiclient через спільний кеш:
+    свіжий запис повертається одразу; прострочений ревалідується через If-None-Match (304 - без тіла);
+    одночасні запити того самого ключа з різних процесів об'єднуються через замок.
+    Без кешу (cache=None) - звичайний request.execute().
+    """
+    if cache is None:
+        return request.execute()
+
+    key = request_cache_key(request)
+    owner = uuid.uuid4().hex
+    deadline = time.time() + COALESCE_WAIT_SECONDS
+    while True:
+        entry = cache.get(key)
+        if entry and entry["expires_at"] > time.time():
+            incr("fetch_cache.hits")
+            return json.loads(entry["body"])
+        if cache.acquire_lock(key, owner):
+            break
+        if time.time() > deadline:
+            # Власник замка не встиг - завантажуємо самі, без замка
+            owner = None
+            break
+        # Інший процес уже завантажує цей ключ - чекаємо на його результат
+        with span("fetch_cache.wait_coalesced", category="cache"):
+            time.sleep(COALESCE_POLL_SECONDS)
+
+    try:
+        if entry and entry.get("etag"):
+            request.headers["If-None-Match"] = entry["etag"]
+        try:
+            body, etag = _execute_with_headers(request)
+        except HttpError as e:
+            if entry and e.resp.status == 304:
+                incr("fetch_cache.revalidated_304")
+                cache.touch(key, ttl)
+                return json.loads(entry["body"])
+            raise
+        incr("fetch_cache.misses")
+        cache.set(key, json.dumps(body, ensure_ascii=False), etag, ttl)
+        return body
+    finally:
+        if owner:
+            cache.release_lock(key, owner)
@@ -0,0 +1,242 @@
+# job_queue.py
+# Локальна черга задач аналізу на SQLite (та сама база, що й сховище відео).
+#
+# Дашборд ставить задачу з ключем (канал, періоди, версія промпту) і лише опитує її стан,
+# а виконують задачі окремі процеси analysis_worker.py. Якщо така сама задача вже в черзі,
+# виконується або нещодавно завершилася, повертається вона - кілька сесій (і користувачів)
+# з однаковими періодами підключаються до однієї задачі замість дублювання всіх викликів API.
+# Етап і прогрес задачі зберігаються в базі, тож сторінку можна закрити і повернутися пізніше.
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import video_store
+
+JOB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_key TEXT NOT NULL,
+    params_json TEXT NOT NULL,
+    status TEXT NOT NULL,  -- queued | running | done | failed
+    stage TEXT,
+    progress_json TEXT,
+    result_json TEXT,
+    error TEXT,
+    worker_id TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,  -- скільки разів задачу забирав воркер
+    created_at REAL NOT NULL,  -- unix time
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_analysis_jobs_key ON analysis_jobs (job_key, status);
+CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status ON analysis_jobs (status, id);
+
+CREATE TABLE IF NOT EXISTS analysis_workers (
+    worker_id TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
+"""
+
+# Скільки секунд результат завершеної задачі повторно використовується для такого самого запиту
+RESULT_REUSE_SECONDS = 3600
+# Як часто воркер відмічається, що живий, і через скільки без відмітки його вважають "мертвим"
+HEARTBEAT_INTERVAL_SECONDS = 10
+STALE_AFTER_SECONDS = 60
+# Скільки разів задачу можна забрати заново після "смерті" воркера (OOM, segfault), перш ніж
+# вважати, що її валить сама задача, і позначити як невдалу
+MAX_JOB_ATTEMPTS = 3
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# З'єднання з дашборду спільне для всіх сесій (потоків), а BEGIN IMMEDIATE не можна вкладати
+_transaction_lock = threading.Lock()
+
+
+def connect(db_path=None):
+    """Відкриває базу сховища і створює таблиці черги."""
+    conn = video_store.connect(db_path)
+    conn.executescript(JOB_SCHEMA)
+    # Бази, створені до появи лічильника спроб
+    columns = {row['name'] for row in conn.execute("PRAGMA table_info(analysis_jobs)")}
+    if 'attempts' not in columns:
+        with conn:
+            conn.execute("ALTER TABLE analysis_jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+    return conn
+
+
+def make_job_key(channel_id, periods, prompt_version, sample_size=None):
+    """
+    Ключ задачі: канал, періоди ([(початок, кінець), ...]) і версія промпту,
+    а для режиму оцінки - ще й розмір вибірки.
+    """
+    key_parts = [channel_id, [[str(start), str(end)] for start, end in periods], prompt_version]
+    if sample_size is not None:
+        key_parts.append(int(sample_size))
+    payload = json.dumps(key_parts, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _json_default(value):
+    # Числа numpy/pandas у результатах (лічильники, середні)
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+def submit_job(conn, channel_id, periods, prompt_version, sample_size=None, options=None):
+    """
+    Ставить задачу аналізу в чергу або повертає вже наявну таку саму (в черзі, виконується
+    або завершена не раніше ніж RESULT_REUSE_SECONDS тому).
+    sample_size - розмір вибірки на період для режиму оцінки (None - повний аналіз).
+    options (наприклад, {'profile': True}) не входять у ключ. Повертає (job_id, чи створено нову).
+    """
+    job_key = make_job_key(channel_id, periods, prompt_version, sample_size)
+    params = {
+        'channel_id': channel_id,
+        'periods': [[str(start), str(end)] for start, end in periods],
+        'prompt_version': prompt_version,
+        'sample_size': sample_size,
+        **(options or {}),
+    }
+    now = time.time()
+    with _transaction_lock, conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            """
+            SELECT id FROM analysis_jobs
+            WHERE job_key = ? AND (status IN ('queued', 'running') OR (status = 'done' AND finished_at > ?))
+            ORDER BY id DESC LIMIT 1
+            """,
+            (job_key, now - RESULT_REUSE_SECONDS)
+        ).fetchone()
+        if row is not None:
+            return row['id'], False
+        cursor = conn.execute(
+            "INSERT INTO analysis_jobs (job_key, params_json, status, created_at) VALUES (?, ?, 'queued', ?)",
+            (job_key, _dumps(params), now)
+        )
+        return cursor.lastrowid, True
+
+
+def claim_next_job(conn, worker_id):
+    """
+    Забирає найстарішу задачу з черги (або задачу, воркер якої перестав відмічатися) і позначає її
+    як виконувану цим воркером. Задача, воркер якої "помер" уже MAX_JOB_ATTEMPTS разів, позначається
+    як невдала замість нової спроби. Повертає {'id', 'params'} або None.
+    """
+    now = time.time()
+    with _transaction_lock, conn:
+        conn.execute("BEGIN IMMEDIATE")
+        while True:
+            row = conn.execute(
+                """
+                SELECT id, params_json, attempts FROM analysis_jobs
+                WHERE status = 'queued' OR (status = 'running' AND heartbeat_at < ?)
+                ORDER BY id LIMIT 1
+                """,
+                (now - STALE_AFTER_SECONDS,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row['attempts'] < MAX_JOB_ATTEMPTS:
+                break
+            conn.execute(
+                "UPDATE analysis_jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (f"Воркер завершився аварійно під час виконання задачі {row['attempts']} раз(и) поспіль "
+                 f"(наприклад, через нестачу пам'яті) - задачу зупинено.", now, row['id'])
+            )
+        conn.execute(
+            """
+            UPDATE analysis_jobs SET status = 'running', worker_id = ?, started_at = ?, heartbeat_at = ?,
+                attempts = attempts + 1
+            WHERE id = ?
+            """,
+            (worker_id, now, now, row['id'])
+        )
+        return {'id': row['id'], 'params': json.loads(row['params_json'])}
+
+
+def update_progress(conn, job_id, stage, progress):
+    """Зберігає поточний етап задачі та його прогрес (JSON-сумісний словник)."""
+    with conn:
+        conn.execute(
+            "UPDATE analysis_jobs SET stage = ?, progress_json = ?, heartbeat_at = ? WHERE id = ?",
+            (stage, _dumps(progress), time.time(), job_id)
+        )
+
+
+def complete_job(conn, job_id, result):
+    with conn:
+        conn.execute(
+            "UPDATE analysis_jobs SET status = 'done', result_json = ?, finished_at = ? WHERE id = ?",
+            (_dumps(result), time.time(), job_id)
+        )
+
+
+def fail_job(conn, job_id, error):
+    with conn:
+        conn.execute(
+            "UPDATE analysis_jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+            (error, time.time(), job_id)
+        )
+
+
+def get_job(conn, job_id, with_result=True):
+    """Повертає задачу (з розібраними params/progress/result) або None."""
+    columns = "id, status, stage, params_json, progress_json, error, created_at, started_at, finished_at"
+    if with_result:
+        columns += ", result_json"
+    row = conn.execute(f"SELECT {columns} FROM analysis_jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = {key: row[key] for key in ('id', 'status', 'stage', 'error', 'created_at', 'started_at', 'finished_at')}
+    job['params'] = json.loads(row['params_json'])
+    job['progress'] = json.loads(row['progress_json']) if row['progress_json'] else {}
+    if with_result:
+        job['result'] = json.loads(row['result_json']) if row['result_json'] else None
+    return job
+
+
+def queue_position(conn, job_id):
+    """Скільки задач у черзі стоїть перед цією."""
+    return conn.execute(
+        "SELECT COUNT(*) FROM analysis_jobs WHERE status = 'queued' AND id < ?", (job_id,)
+    ).fetchone()[0]
+
+
+def heartbeat(conn, worker_id):
+    """Відмічає, що воркер живий, і продовжує "оренду" його задач, що виконуються."""
+    now = time.time()
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO analysis_workers (worker_id, pid, heartbeat_at) VALUES (?, ?, ?)
+            ON CONFLICT(worker_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at
+            """,
+            (worker_id, os.getpid(), now)
+        )
+        conn.execute(
+            "UPDATE analysis_jobs SET heartbeat_at = ? WHERE worker_id = ? AND status = 'running'", (now, worker_id)
+        )
+
+
+def remove_worker(conn, worker_id):
+    with conn:
+        conn.execute("DELETE FROM analysis_workers WHERE worker_id = ?", (worker_id,))
+
+
+def has_live_worker(conn):
+    """Чи є хоча б один воркер, що відмічався нещодавно."""
+    row = conn.execute(
+        "SELECT COUNT(*) FROM analysis_workers WHERE heartbeat_at > ?", (time.time() - STALE_AFTER_SECONDS,)
+    ).fetchone()
+    return row[0] > 0
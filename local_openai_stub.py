@@ -0,0 +1,154 @@
+# local_openai_stub.py
+# Мінімальна локальна заглушка OpenAI API для перевірки batch_backfill.py без реальних викликів і витрат.
+# Підтримує рівно те, що використовує backfill: завантаження файлів, створення/отримання batch,
+# завантаження вмісту файлу та /v1/chat/completions.
+#
+# Запуск:
+#   python local_openai_stub.py --port 8000
+#   OPENAI_API_KEY=stub python batch_backfill.py run --base-url http://localhost:8000/v1 --poll-interval 1
+
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import default as default_email_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from categorization import CATEGORIES, get_code_to_category, get_default_other_category
+
+_files = {}    # file_id -> {"meta": {...}, "content": bytes}
+_batches = {}  # batch_id -> {...}
+_lock = threading.Lock()
+
+
+def stub_chat_completion(body):
+    """
+    Детермінована "модель": повертає першу категорію, назва якої трапляється в назві відео,
+    інакше "Різне". Для перевірки конвеєра цього достатньо.
+    """
+    user_content = body["messages"][-1]["content"]
+    title_match = re.search(r'Назва відео: "(.*)"', user_content)
+    title = title_match.group(1).lower() if title_match else ""
+    answer = next((cat for cat in CATEGORIES if cat.split()[0].rstrip(",").lower() in title),
+                  get_default_other_category(CATEGORIES))
+    if body.get("response_format"):
+        # Структурована відповідь з кодом категорії, як у categorization.build_response_format
+        category_to_code = {cat: code for code, cat in get_code_to_category(CATEGORIES).items()}
+        answer = json.dumps({"code": category_to_code[answer]})
+    prompt_tokens = len(user_content) // 4
+    completion_tokens = max(1, len(answer) // 4)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens}
+    }
+
+
+def _store_file(filename, purpose, content):
+    file_id = f"file-{uuid.uuid4().hex[:12]}"
+    meta = {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+            "filename": filename, "purpose": purpose, "status": "processed"}
+    with _lock:
+        _files[file_id] = {"meta": meta, "content": content}
+    return meta
+
+
+def _run_batch(input_file_id):
+    """Виконує batch одразу: кожен рядок вхідного файлу проганяється через stub_chat_completion."""
+    output_lines = []
+    for raw_line in _files[input_file_id]["content"].decode("utf-8").splitlines():
+        if not raw_line.strip():
+            continue
+        line = json.loads(raw_line)
+        output_lines.append(json.dumps({
+            "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+            "custom_id": line["custom_id"],
+            "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": stub_chat_completion(line["body"])},
+            "error": None
+        }, ensure_ascii=False))
+    output_meta = _store_file("batch_output.jsonl", "batch_output", ("\n".join(output_lines) + "\n").encode("utf-8"))
+    return output_meta["id"], len(output_lines)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def _send_json(self, payload, status=200):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        body = self._read_body()
+        if path.endswith("/chat/completions"):
+            return self._send_json(stub_chat_completion(json.loads(body)))
+        if path.endswith("/files"):
+            # multipart/form-data розбираємо стандартним email-парсером
+            message = BytesParser(policy=default_email_policy).parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+            )
+            fields = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+            file_part = fields["file"]
+            return self._send_json(_store_file(file_part.get_filename() or "upload.jsonl",
+                                               fields["purpose"].get_content().strip(),
+                                               file_part.get_payload(decode=True)))
+        if path.endswith("/batches"):
+            params = json.loads(body)
+            output_file_id, total = _run_batch(params["input_file_id"])
+            batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+            batch = {
+                "id": batch_id, "object": "batch", "endpoint": params["endpoint"],
+                "input_file_id": params["input_file_id"], "completion_window": params["completion_window"],
+                "status": "completed", "output_file_id": output_file_id, "error_file_id": None,
+                "created_at": int(time.time()), "metadata": params.get("metadata"),
+                "request_counts": {"total": total, "completed": total, "failed": 0}
+            }
+            with _lock:
+                _batches[batch_id] = batch
+            return self._send_json(batch)
+        self._send_json({"error": {"message": f"Unknown endpoint {path}"}}, status=404)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        content_match = re.search(r"/files/([^/]+)/content$", path)
+        if content_match and content_match.group(1) in _files:
+            data = _files[content_match.group(1)]["content"]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        batch_match = re.search(r"/batches/([^/]+)$", path)
+        if batch_match and batch_match.group(1) in _batches:
+            return self._send_json(_batches[batch_match.group(1)])
+        self._send_json({"error": {"message": f"Not found: {path}"}}, status=404)
+
+    def log_message(self, format, *args):
+        pass # Не засмічуємо консоль логами кожного запиту
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Локальна заглушка OpenAI API для офлайн-перевірок.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"Заглушка OpenAI API: http://{args.host}:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# near_duplicates.py
+# Пошук майже-дублікатів відео (епізоди серій, повтори стрімів, перезаливи) через MinHash + LSH,
+# щоб нове відео, дуже схоже на вже категоризоване, успадковувало його категорію без виклику GPT.
+#
+# Текст відео = назва + опис без шаблонного підвалу (boilerplate.strip_boilerplate).
+# Шингли й сигнатура MinHash рахуються векторно в numpy, пошук кандидатів - через LSH-кошики по смугах,
+# а схожість з усіма кандидатами порівнюється однією операцією над матрицею сигнатур,
+# тож пошук у вже побудованому індексі займає долі мілісекунди і не залежить від розміру індексу.
+#
+# Індекс каналу живе весь час роботи процесу (get_channel_index) і лише дочитує зі сховища
+# категорії, записані після попереднього звернення, - сигнатури не перераховуються для кожної задачі.
+
+import re
+import threading
+
+import numpy as np
+
+import video_store
+from boilerplate import strip_boilerplate
+
+# Параметри MinHash/LSH: 64 перестановки = 16 смуг по 4 рядки.
+# Поріг LSH для кандидатів ~ (1/16)^(1/4) ≈ 0.5, остаточне рішення - за SIMILARITY_THRESHOLD.
+NUM_PERM = 64
+NUM_BANDS = 16
+# Мінімальна оцінка схожості (Jaccard по шинглах), з якої відео вважається дублікатом
+SIMILARITY_THRESHOLD = 0.8
+# Розмір символьних шинглів
+SHINGLE_SIZE = 5
+# Занадто короткі тексти (наприклад, назва "Стрім") не порівнюємо - схожість буде випадковою
+MIN_SHINGLES = 12
+# Опис береться в тих же межах, що й у промпті категоризації
+MAX_TEXT_CHARS = 1700
+# Скільки останніх відео з одного LSH-кошика перевіряти. У серії з тисяч майже однакових відео всі вони
+# потрапляють в ті самі кошики, а для успадкування категорії досить порівняти з найсвіжішими
+MAX_CANDIDATES_PER_BAND = 64
+
+_SHINGLE_HASH_BASE = np.uint64(1099511628211)
+_HASH_SHIFT = np.uint64(32)
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+_channel_indexes = {}  # (channel_id, prompt_version) -> {'index', 'boilerplate_lines', 'last_rowid'}
+_channel_indexes_lock = threading.Lock()
+
+
+def video_text(title, description, boilerplate_lines=None):
+    """Текст відео для порівняння: назва + опис без шаблонного підвалу."""
+    description = strip_boilerplate(description or "", boilerplate_lines) if boilerplate_lines else (description or "")
+    return f"{title or ''} {description}"[:MAX_TEXT_CHARS]
+
+
+def shingle_hashes(text, shingle_size=SHINGLE_SIZE):
+    """64-бітні хеші унікальних символьних шинглів нормалізованого тексту (поліноміальний хеш по кодах символів)."""
+    text = _NON_WORD_RE.sub(" ", text.lower()).strip()
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    count = len(codes) - shingle_size + 1
+    if count <= 0:
+        return np.empty(0, dtype=np.uint64)
+    hashes = np.zeros(count, dtype=np.uint64)
+    # Переповнення uint64 тут навмисне - це хеш за модулем 2^64
+    for offset in range(shingle_size):
+        hashes = hashes * _SHINGLE_HASH_BASE + codes[offset:offset + count]
+    return np.unique(hashes)
+
+
+class NearDuplicateIndex:
+    """
+    Інкрементний MinHash/LSH-індекс категоризованих відео.
+    add() додає відео з його категорією, find() повертає найсхожіше відео вище порогу.
+    Потокобезпечний: один індекс каналу спільно використовують усі задачі процесу воркера.
+    Сигнатури зберігаються рядками однієї матриці, щоб порівнювати з усіма кандидатами за раз.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, num_bands=NUM_BANDS, threshold=SIMILARITY_THRESHOLD, seed=1):
+        if num_perm % num_bands:
+            raise ValueError("num_perm має ділитися на num_bands без остачі")
+        rng = np.random.RandomState(seed)
+        # Хеш-функції виду (a * h + b) mod 2^64 >> 32 (multiply-shift), a - непарне
+        self._a = rng.randint(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.randint(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+        self.num_bands = num_bands
+        self.rows_per_band = num_perm // num_bands
+        self.threshold = threshold
+        self._buckets = [{} for _ in range(num_bands)]  # band -> {ключ смуги: [номер рядка, ...]}
+        self._matrix = np.empty((0, num_perm), dtype=np.uint64)  # сигнатури по рядках (із запасом місця)
+        self._rows = {}  # video_id -> номер рядка
+        self._video_ids = []  # номер рядка -> video_id
+        self._categories = []  # номер рядка -> категорія
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._video_ids)
+
+    def __contains__(self, video_id):
+        return video_id in self._rows
+
+    def signature(self, text):
+        """MinHash-сигнатура тексту або None, якщо текст закороткий для надійного порівняння."""
+        hashes = shingle_hashes(text)
+        if len(hashes) < MIN_SHINGLES:
+            return None
+        # Усі перестановки для всіх шинглів одразу (на місці, без проміжних масивів), далі мінімум по шинглах.
+        # Зсув монотонний, тож його досить застосувати до мінімумів
+        permuted = np.multiply.outer(self._a, hashes)
+        permuted += self._b[:, None]
+        return permuted.min(axis=1) >> _HASH_SHIFT
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows_per_band:(i + 1) * self.rows_per_band].tobytes() for i in range(self.num_bands)]
+
+    def add(self, video_id, text, category, signature=None):
+        """Додає відео в індекс. Повертає False, якщо текст закороткий для індексації."""
+        with self._lock:
+            row = self._rows.get(video_id)
+            if row is not None:
+                self._categories[row] = category
+                return True
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None:
+            return False
+        with self._lock:
+            if video_id in self._rows:
+                self._categories[self._rows[video_id]] = category
+                return True
+            row = len(self._video_ids)
+            if row == len(self._matrix):
+                grown = np.empty((max(64, 2 * len(self._matrix)), self.num_perm), dtype=np.uint64)
+                grown[:row] = self._matrix
+                self._matrix = grown
+            self._matrix[row] = signature
+            self._rows[video_id] = row
+            self._video_ids.append(video_id)
+            self._categories.append(category)
+            for band, key in zip(self._buckets, self._band_keys(signature)):
+                band.setdefault(key, []).append(row)
+        return True
+
+    def find(self, text=None, signature=None, exclude_id=None):
+        """
+        Шукає найсхожіше відео в індексі.
+        Повертає (video_id, category, similarity) або None, якщо схожість нижче порогу.
+        """
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None:
+            return None
+        with self._lock:
+            candidates = set()
+            for band, key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(band.get(key, ())[-MAX_CANDIDATES_PER_BAND:])
+            candidates.discard(self._rows.get(exclude_id))
+            if not candidates:
+                return None
+            rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            similarities = (self._matrix[rows] == signature).mean(axis=1)
+            best = int(similarities.argmax())
+            if similarities[best] < self.threshold:
+                return None
+            row = int(rows[best])
+            return self._video_ids[row], self._categories[row], float(similarities[best])
+
+
+def _add_from_store(index, conn, channel_id, prompt_version, boilerplate_lines, after_rowid=None):
+    """
+    Додає в індекс категоризовані відео каналу зі сховища (лише записані після after_rowid).
+    Категорії, що самі були успадковані від дублікатів, у індекс не йдуть - щоб уникнути "ланцюжків".
+    Повертає rowid останнього прочитаного запису категорії.
+    """
+    last_rowid = after_rowid or 0
+    for video in video_store.get_categorized_videos(conn, channel_id, prompt_version, exclude_source="near_duplicate",
+                                                    after_rowid=after_rowid):
+        index.add(video['id'], video_text(video['title'], video['description'], boilerplate_lines), video['category'])
+        last_rowid = max(last_rowid, video['category_rowid'])
+    return last_rowid
+
+
+def get_channel_index(conn, channel_id, prompt_version, boilerplate_lines=None):
+    """
+    Індекс каналу, спільний для всіх задач процесу. Перше звернення будує його зі сховища,
+    наступні лише дочитують категорії, записані з того часу (дашбордом, іншими воркерами, batch_backfill.py).
+    Якщо шаблонні рядки каналу перевчились, тексти відео змінились - індекс будується заново.
+    """
+    key = (channel_id, prompt_version)
+    boilerplate_lines = set(boilerplate_lines or ())
+    with _channel_indexes_lock:
+        cached = _channel_indexes.get(key)
+        if cached is None or cached['boilerplate_lines'] != boilerplate_lines:
+            cached = {'index': NearDuplicateIndex(), 'boilerplate_lines': boilerplate_lines, 'last_rowid': None}
+            _channel_indexes[key] = cached
+        cached['last_rowid'] = _add_from_store(
+            cached['index'], conn, channel_id, prompt_version, boilerplate_lines, after_rowid=cached['last_rowid']
+        )
+        return cached['index']
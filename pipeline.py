@@ -0,0 +1,68 @@
+# pipeline.py
+# Конвеєр "завантаження -> категоризація" з обмеженою пам'яттю.
+# Сторінки з YouTube завантажуються у фоновому потоці і через обмежену чергу передаються
+# споживачу (категоризації), тож наступні сторінки вантажаться, поки поточна категоризується,
+# а в пам'яті одночасно перебуває не більше maxsize сторінок.
+
+import contextvars
+import queue
+import threading
+
+from tracing import span
+
+# Скільки завантажених, але ще не оброблених сторінок може чекати в черзі
+DEFAULT_PREFETCH_PAGES = 2
+
+_DONE = object()
+
+
+class _ProducerError:
+    def __init__(self, exception):
+        self.exception = exception
+
+
+def prefetch(iterable, maxsize=DEFAULT_PREFETCH_PAGES):
+    """
+    Генератор: ітерує iterable у фоновому потоці через чергу на maxsize елементів.
+    Виняток з фонового потоку прокидається споживачу. Якщо споживач зупинився раніше
+    (break або виняток), фоновий потік завершується після поточного елемента.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        # Чекаємо місця в черзі, але реагуємо на зупинку споживача
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(_ProducerError(e))
+            return
+        put(_DONE)
+
+    # Фоновий потік отримує копію контексту, щоб спани завантаження потрапили в трейс поточного запуску
+    producer = threading.Thread(target=contextvars.copy_context().run, args=(produce,),
+                                name="prefetch-producer", daemon=True)
+    producer.start()
+    try:
+        while True:
+            # Час, коли споживач простоює в очікуванні наступної сторінки
+            with span("pipeline.wait_page", category="pipeline"):
+                item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _ProducerError):
+                raise item.exception
+            yield item
+    finally:
+        stop.set()
@@ -0,0 +1,175 @@
+# sampling.py
+# Оцінка статистики по категоріях за стратифікованою вибіркою замість категоризації кожного відео.
+#
+# Метадані (дата, перегляди) відомі для всіх відео періоду - їх дає YouTube API без витрат на GPT.
+# Відео ділиться на страти "місяць публікації x дециль переглядів", з кожної страти береться
+# пропорційна частка вибірки, і категоризуються лише відео вибірки. Частки категорій, кількість
+# відео та середні перегляди в категоріях оцінюються стратифікованими оцінками з 95% довірчими інтервалами.
+#
+# Порядок відео всередині страти детермінований (хеш id), а розподіл вибірки між стратами
+# монотонний за розміром вибірки: вибірка на 400 відео містить усю вибірку на 200. Тому уточнення
+# оцінки докатегоризовує лише нові відео (решта вже в кеші сховища), аж до повного перепису.
+
+import hashlib
+import heapq
+import math
+from collections import defaultdict
+
+import pandas as pd
+
+# Кількість квантильних груп за переглядами всередині періоду (децилі)
+VIEW_QUANTILES = 10
+# Квантиль нормального розподілу для 95% довірчого інтервалу
+Z_95 = 1.96
+
+
+def assign_strata(videos, view_quantiles=VIEW_QUANTILES):
+    """
+    Повертає {video_id: страта} для відео періоду, де страта - "РРРР-ММ|дециль".
+    Децилі рахуються за рангом переглядів серед усіх відео періоду (нічиї розводяться за id).
+    """
+    ranked = sorted(videos, key=lambda video: (video['views'], video['id']))
+    strata = {}
+    for rank, video in enumerate(ranked):
+        quantile = rank * view_quantiles // len(ranked)
+        strata[video['id']] = f"{str(video['published_at'])[:7]}|{quantile}"
+    return strata
+
+
+def _stratum_order_key(video_id):
+    # Детермінований "випадковий" порядок, незалежний від порядку завантаження
+    return hashlib.sha1(str(video_id).encode("utf-8")).hexdigest()
+
+
+def allocate_sample(strata_sizes, sample_size):
+    """
+    Пропорційний розподіл sample_size між стратами (метод Сент-Лагю): кожна наступна одиниця вибірки
+    дістається страті з найменшим (n_h + 0.5) / N_h. Розподіл для більшої вибірки завжди
+    містить розподіл для меншої. Якщо sample_size >= кількості відео - повертає всі страти повністю.
+    """
+    total = sum(strata_sizes.values())
+    if sample_size >= total:
+        return dict(strata_sizes)
+    allocation = {stratum: 0 for stratum in strata_sizes}
+    heap = [(0.5 / size, stratum) for stratum, size in strata_sizes.items() if size > 0]
+    heapq.heapify(heap)
+    for _ in range(sample_size):
+        _, stratum = heapq.heappop(heap)
+        allocation[stratum] += 1
+        if allocation[stratum] < strata_sizes[stratum]:
+            heapq.heappush(heap, ((allocation[stratum] + 0.5) / strata_sizes[stratum], stratum))
+    return allocation
+
+
+def draw_stratified_sample(videos, sample_size):
+    """
+    Стратифікована вибірка з відео періоду.
+    Повертає (відео вибірки, {video_id: страта}, {страта: кількість відео в страті}).
+    """
+    stratum_of = assign_strata(videos) if videos else {}
+    by_stratum = defaultdict(list)
+    for video in videos:
+        by_stratum[stratum_of[video['id']]].append(video)
+    strata_sizes = {stratum: len(items) for stratum, items in by_stratum.items()}
+    allocation = allocate_sample(strata_sizes, sample_size)
+
+    sample = []
+    for stratum in sorted(by_stratum):
+        ordered = sorted(by_stratum[stratum], key=lambda video: _stratum_order_key(video['id']))
+        sample.extend(ordered[:allocation[stratum]])
+    return sample, stratum_of, strata_sizes
+
+
+def _stratified_variance(values_by_stratum, strata_sizes, weights, pooled_variance):
+    """
+    Дисперсія стратифікованої оцінки середнього: сума W_h^2 (1 - f_h) s_h^2 / n_h.
+    Для страти з одним відео s_h^2 невідома - береться дисперсія за всією вибіркою.
+    """
+    variance = 0.0
+    for stratum, values in values_by_stratum.items():
+        n_h = len(values)
+        N_h = strata_sizes[stratum]
+        if n_h >= N_h:
+            continue  # Страта переписана повністю - похибки немає
+        if n_h >= 2:
+            mean = sum(values) / n_h
+            s2 = sum((value - mean) ** 2 for value in values) / (n_h - 1)
+        else:
+            s2 = pooled_variance
+        variance += weights[stratum] ** 2 * (1 - n_h / N_h) * s2 / n_h
+    return variance
+
+
+def _sample_variance(values):
+    if len(values) < 2:
+        return 0.0
+    mean = sum(values) / len(values)
+    return sum((value - mean) ** 2 for value in values) / (len(values) - 1)
+
+
+def estimate_category_stats(sample_rows, strata_sizes, z=Z_95):
+    """
+    Оцінює за вибіркою (рядки з 'stratum', 'category', 'views') для кожної категорії:
+    частку (share), кількість відео (video_count) та середні перегляди (average_views) з межами
+    довірчого інтервалу (*_low, *_high). Середні перегляди в категорії - відношення двох
+    стратифікованих оцінок, дисперсія - лінеаризацією.
+    Страти без жодного відео у вибірці (можливо при малій вибірці) не враховуються: їх вага
+    розподіляється між рештою страт.
+    """
+    columns = ['category', 'share', 'share_low', 'share_high', 'video_count', 'video_count_low',
+               'video_count_high', 'average_views', 'average_views_low', 'average_views_high', 'sample_count']
+    if not sample_rows:
+        return pd.DataFrame(columns=columns)
+
+    population = sum(strata_sizes.values())
+    rows_by_stratum = defaultdict(list)
+    for row in sample_rows:
+        rows_by_stratum[row['stratum']].append(row)
+    covered = sum(strata_sizes[stratum] for stratum in rows_by_stratum)
+    weights = {stratum: strata_sizes[stratum] / covered for stratum in rows_by_stratum}
+
+    estimates = []
+    for category in sorted({row['category'] for row in sample_rows}):
+        # Частка: середнє індикатора "відео належить категорії"
+        indicators = {stratum: [1.0 if row['category'] == category else 0.0 for row in rows]
+                      for stratum, rows in rows_by_stratum.items()}
+        share = sum(weights[stratum] * sum(values) / len(values) for stratum, values in indicators.items())
+        pooled_indicators = [value for values in indicators.values() for value in values]
+        share_se = math.sqrt(_stratified_variance(indicators, strata_sizes, weights,
+                                                  _sample_variance(pooled_indicators)))
+
+        # Середні перегляди: R = сума W_h * mean(y * I) / share, лінеаризація d = (y - R) * I
+        views_in_category = {stratum: [row['views'] if row['category'] == category else 0.0 for row in rows]
+                             for stratum, rows in rows_by_stratum.items()}
+        total_views_share = sum(weights[stratum] * sum(values) / len(values)
+                                for stratum, values in views_in_category.items())
+        average_views = total_views_share / share if share > 0 else 0.0
+        residuals = {stratum: [(row['views'] - average_views) if row['category'] == category else 0.0
+                               for row in rows]
+                     for stratum, rows in rows_by_stratum.items()}
+        pooled_residuals = [value for values in residuals.values() for value in values]
+        average_views_se = (math.sqrt(_stratified_variance(residuals, strata_sizes, weights,
+                                                           _sample_variance(pooled_residuals))) / share
+                            if share > 0 else 0.0)
+
+        sample_count = int(sum(pooled_indicators))
+        share_low, share_high = max(0.0, share - z * share_se), min(1.0, share + z * share_se)
+        estimates.append({
+            'category': category,
+            'share': share, 'share_low': share_low, 'share_high': share_high,
+            'video_count': round(share * population),
+            # Нижня межа кількості не менша за кількість таких відео, вже знайдених у вибірці;
+            # округлення до 6 знаків прибирає похибку float, щоб при переписі межі збігалися з оцінкою
+            'video_count_low': max(sample_count, math.floor(round(share_low * population, 6))),
+            'video_count_high': min(population, math.ceil(round(share_high * population, 6))),
+            'average_views': round(average_views),
+            'average_views_low': max(0, round(average_views - z * average_views_se)),
+            'average_views_high': round(average_views + z * average_views_se),
+            'sample_count': sample_count,
+        })
+    return pd.DataFrame(estimates, columns=columns)
+
+
+def format_interval(low, high):
+    """Довірчий інтервал для таблиць і звіту, наприклад "[1,200 - 3,400]"."""
+    return f"[{int(low):,} - {int(high):,}]"
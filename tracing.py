@@ -0,0 +1,207 @@
+# tracing.py
+# Інструментування запуску аналізу: вкладені таймінгові спани для кожного етапу та зовнішнього
+# виклику, лічильники (запити, токени, влучання в кеш) і експорт у формат Chrome trace
+# (відкривається в chrome://tracing або https://ui.perfetto.dev).
+#
+# Поточний трейсер зберігається в contextvar, тому паралельні сесії Streamlit не змішують
+# свої трейси, а фонові потоки отримують трейсер, якщо запущені через contextvars.copy_context().
+# Поза запуском (наприклад, у batch_backfill.py) всі виклики - no-op.
+
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+# Куди зберігати трейси запусків; можна перевизначити змінною оточення AINALITICS_TRACE_DIR
+TRACE_DIR = os.environ.get("AINALITICS_TRACE_DIR", "traces")
+# Скільки рядків статистики cProfile зберігати в трейсі
+PROFILE_TOP_LINES = 25
+
+_current_tracer = contextvars.ContextVar("current_tracer", default=None)
+
+
+class Tracer:
+    """Збирає спани та лічильники одного запуску аналізу."""
+
+    def __init__(self, run_name, profile=False):
+        self.run_name = run_name
+        self.profile = profile  # Чи вмикати cProfile у profiled()
+        self.started_at = datetime.now()
+        self.events = []
+        self.counters = Counter()
+        self.profiles = {}  # назва блоку -> (шлях до .prof, топ статистики текстом)
+        self._origin_ns = time.perf_counter_ns()
+        self._lock = threading.Lock()
+        self._stage = None  # (назва, початок) поточного послідовного етапу
+
+    def _record(self, name, category, start_ns, end_ns, args):
+        with self._lock:
+            self.events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start_ns - self._origin_ns) / 1000,
+                "dur": (end_ns - start_ns) / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": args
+            })
+
+    @contextmanager
+    def span(self, name, category="stage", **args):
+        """Вимірює тривалість блоку коду; args потрапляють у трейс як додаткові атрибути."""
+        start_ns = time.perf_counter_ns()
+        try:
+            yield args
+        finally:
+            self._record(name, category, start_ns, time.perf_counter_ns(), args)
+
+    def start_stage(self, name):
+        """
+        Починає новий послідовний етап (і завершує попередній) - для лінійного скрипта Streamlit,
+        де обгортати кожен етап у with незручно.
+        """
+        self.end_stage()
+        self._stage = (name, time.perf_counter_ns())
+
+    def end_stage(self):
+        if self._stage is not None:
+            name, start_ns = self._stage
+            self._stage = None
+            self._record(f"stage.{name}", "stage", start_ns, time.perf_counter_ns(), {})
+
+    def incr(self, counter, value=1):
+        with self._lock:
+            self.counters[counter] += value
+
+    def summary(self):
+        """Агрегація спанів за назвою: кількість, сумарний, середній і максимальний час (мс)."""
+        by_name = {}
+        for event in self.events:
+            item = by_name.setdefault(event["name"], {"name": event["name"], "category": event["cat"], "count": 0,
+                                                      "total_ms": 0.0, "max_ms": 0.0})
+            duration_ms = event["dur"] / 1000
+            item["count"] += 1
+            item["total_ms"] += duration_ms
+            item["max_ms"] = max(item["max_ms"], duration_ms)
+        for item in by_name.values():
+            item["mean_ms"] = item["total_ms"] / item["count"]
+        return sorted(by_name.values(), key=lambda item: item["total_ms"], reverse=True)
+
+    def to_chrome_trace(self):
+        """Трейс у форматі Chrome Trace Event (JSON Object Format)."""
+        return {
+            "traceEvents": list(self.events),
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "run_name": self.run_name,
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "counters": dict(self.counters),
+                "profiles": {name: path for name, (path, _) in self.profiles.items()}
+            }
+        }
+
+    def save(self, trace_dir=TRACE_DIR):
+        """Зберігає трейс запуску у файл JSON і повертає шлях до нього."""
+        os.makedirs(trace_dir, exist_ok=True)
+        path = os.path.join(trace_dir, f"{self.run_name}_{self.started_at:%Y%m%d_%H%M%S}.trace.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+        return path
+
+    @contextmanager
+    def profiled(self, name, trace_dir=TRACE_DIR):
+        """
+        Якщо профілювання увімкнено - запускає блок під cProfile і зберігає .prof-файл
+        (відкривається в snakeviz або pstats), а топ функцій за сумарним часом - у трейсі.
+        """
+        if not self.profile:
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            os.makedirs(trace_dir, exist_ok=True)
+            path = os.path.join(trace_dir, f"{self.run_name}_{self.started_at:%Y%m%d_%H%M%S}_{name}.prof")
+            profiler.dump_stats(path)
+            stats_text = io.StringIO()
+            pstats.Stats(profiler, stream=stats_text).sort_stats("cumulative").print_stats(PROFILE_TOP_LINES)
+            self.profiles[name] = (path, stats_text.getvalue())
+
+
+class _NullTracer:
+    """Трейсер-заглушка поза запуском аналізу."""
+
+    @contextmanager
+    def span(self, name, category="stage", **args):
+        yield args
+
+    def incr(self, counter, value=1):
+        pass
+
+    def start_stage(self, name):
+        pass
+
+    def end_stage(self):
+        pass
+
+    @contextmanager
+    def profiled(self, name, trace_dir=TRACE_DIR):
+        yield
+
+
+_NULL_TRACER = _NullTracer()
+
+
+def start_tracing(run_name, profile=False):
+    """Створює трейсер для нового запуску і робить його поточним у цьому контексті."""
+    tracer = Tracer(run_name, profile=profile)
+    _current_tracer.set(tracer)
+    return tracer
+
+
+def stop_tracing():
+    """Завершує поточний етап і від'єднує трейсер від контексту. Повертає трейсер."""
+    tracer = get_tracer()
+    tracer.end_stage()
+    _current_tracer.set(None)
+    return tracer
+
+
+def get_tracer():
+    return _current_tracer.get() or _NULL_TRACER
+
+
+def span(name, category="stage", **args):
+    """Спан у поточному трейсері (no-op, якщо трейсинг не запущено)."""
+    return get_tracer().span(name, category, **args)
+
+
+def incr(counter, value=1):
+    """Збільшує лічильник у поточному трейсері."""
+    get_tracer().incr(counter, value)
+
+
+def start_stage(name):
+    """Починає наступний послідовний етап у поточному трейсері."""
+    get_tracer().start_stage(name)
+
+
+def record_openai_usage(response, prefix):
+    """Додає лічильники запитів і токенів з відповіді OpenAI (response.usage)."""
+    tracer = get_tracer()
+    tracer.incr(f"{prefix}.requests")
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        tracer.incr(f"{prefix}.prompt_tokens", usage.prompt_tokens or 0)
+        tracer.incr(f"{prefix}.completion_tokens", usage.completion_tokens or 0)
@@ -0,0 +1,194 @@
+# video_search.py
+# Повнотекстовий пошук (SQLite FTS5) по назвах і описах відео зі сховища.
+#
+# Індекс videos_search оновлюється тригерами на таблиці videos, тож будь-який запис у сховище
+# (дашборд, воркер, batch_backfill) одразу потрапляє в пошук без окремого кроку перебудови.
+# Токенізатор unicode61 з remove_diacritics 0: інакше "й" зводиться до "и", а "ї" до "і".
+# Апостроф і дефіс - частина слова ("п'ять", "т-72", "су-25"); усі варіанти апострофа (’ ʼ ` ´)
+# приводяться до "'" і при індексації, і в запитах.
+#
+# Пошук повертає точну кількість відео та статистику переглядів за період (і по категоріях),
+# а title_terms розбиває назву на слова за правилами індексу - з них analysis.py рахує підтеми категорій.
+
+import re
+import sqlite3
+
+APOSTROPHE_VARIANTS = "’ʼ‘`´"
+
+# Службові слова, що не є підтемами
+STOPWORDS = {
+    "і", "й", "та", "а", "але", "або", "чи", "в", "у", "на", "з", "із", "зі", "до", "від", "за", "про", "для",
+    "по", "під", "над", "при", "через", "як", "що", "це", "не", "ні", "так", "вже", "ще", "його", "її", "їх",
+    "ми", "ви", "він", "вона", "вони", "цей", "ця", "ці", "той", "який", "яка", "які", "чому", "коли",
+    "де", "хто", "все", "усі", "всі", "бути", "є", "the", "a", "an", "of", "and", "in", "on", "to", "for",
+}
+
+
+def _sql_normalized(expression):
+    """SQL-вираз, що замінює варіанти апострофа на "'" (працює в тригерах на будь-якому з'єднанні)."""
+    for variant in APOSTROPHE_VARIANTS:
+        expression = f"replace({expression}, '{variant}', '''')"
+    return expression
+
+
+SEARCH_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS videos_search USING fts5(
+    title, description,
+    tokenize = "unicode61 remove_diacritics 0 tokenchars '''-'"
+);
+
+CREATE TRIGGER IF NOT EXISTS videos_search_insert AFTER INSERT ON videos BEGIN
+    INSERT INTO videos_search (rowid, title, description)
+    VALUES (new.rowid, {_sql_normalized("new.title")}, {_sql_normalized("coalesce(new.description, '')")});
+END;
+-- upsert_videos оновлює перегляди при кожному завантаженні, переіндексуємо лише змінений текст
+CREATE TRIGGER IF NOT EXISTS videos_search_update AFTER UPDATE OF title, description ON videos
+WHEN old.title IS NOT new.title OR old.description IS NOT new.description BEGIN
+    DELETE FROM videos_search WHERE rowid = old.rowid;
+    INSERT INTO videos_search (rowid, title, description)
+    VALUES (new.rowid, {_sql_normalized("new.title")}, {_sql_normalized("coalesce(new.description, '')")});
+END;
+CREATE TRIGGER IF NOT EXISTS videos_search_delete AFTER DELETE ON videos BEGIN
+    DELETE FROM videos_search WHERE rowid = old.rowid;
+END;
+"""
+
+SEARCH_COLUMNS = ("title", "description")
+
+_QUERY_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+# Як unicode61 з tokenchars "'-": літери й цифри (без "_"), апостроф і дефіс
+_TITLE_TOKEN_RE = re.compile(r"(?:[^\W_]|['-])+")
+
+
+def ensure_search_index(conn):
+    """
+    Створює індекс і тригери (якщо їх ще немає) та індексує відео, записані до появи індексу.
+    Повертає False, якщо SQLite зібрано без FTS5 - тоді пошук недоступний, а сховище працює як раніше.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'videos_search'"
+    ).fetchone() is not None
+    try:
+        conn.executescript(SEARCH_SCHEMA)
+    except sqlite3.OperationalError as e:
+        if "fts5" in str(e):
+            return False
+        raise
+    if not exists:
+        with conn:
+            conn.execute(
+                f"""
+                INSERT INTO videos_search (rowid, title, description)
+                SELECT rowid, {_sql_normalized("title")}, {_sql_normalized("coalesce(description, '')")} FROM videos
+                """
+            )
+    return True
+
+
+def normalize_text(text):
+    for variant in APOSTROPHE_VARIANTS:
+        text = text.replace(variant, "'")
+    return text
+
+
+def build_match_query(query, column=None):
+    """
+    Перетворює текст із пошукового поля на запит FTS5: кожне слово - окремий терм (усі обов'язкові),
+    текст у лапках - фраза, "*" у кінці слова - пошук за префіксом ("танк*" знайде "танки", "танків").
+    column - шукати лише в назвах ("title") або описах ("description").
+    Терми без жодної літери чи цифри ("(", "-", "'") пропускаються, як і в індексі; якщо не лишилося
+    жодного терма, повертає None.
+    """
+    terms = []
+    for phrase, word in _QUERY_TOKEN_RE.findall(normalize_text(query)):
+        text = phrase if phrase else word
+        prefix = not phrase and text.endswith("*")
+        text = text.rstrip("*").replace('"', "").strip()
+        if any(char.isalnum() for char in text):
+            terms.append(f'"{text}"' + ("*" if prefix else ""))
+    if not terms:
+        return None
+    match_query = " ".join(terms)
+    if column:
+        if column not in SEARCH_COLUMNS:
+            raise ValueError(f"Невідома колонка пошуку: {column}")
+        match_query = f"{column} : ({match_query})"
+    return match_query
+
+
+def _match_rows(conn, channel_id, match_query, start_date, end_date, prompt_version=None, order_by=None, limit=None):
+    category_join = ""
+    category_column = "NULL AS category"
+    params = []
+    if prompt_version:
+        category_join = "LEFT JOIN video_categories c ON c.video_id = v.id AND c.prompt_version = ?"
+        category_column = "c.category"
+        params.append(prompt_version)
+    query = f"""
+        SELECT v.id, v.title, v.views, v.published_at, {category_column}
+        FROM videos v
+        {category_join}
+        WHERE v.rowid IN (SELECT rowid FROM videos_search WHERE videos_search MATCH ?)
+            AND v.channel_id = ? AND substr(v.published_at, 1, 10) BETWEEN ? AND ?
+    """
+    params += [match_query, channel_id, str(start_date), str(end_date)]
+    if order_by:
+        query += f" ORDER BY {order_by}"
+    if limit:
+        query += " LIMIT ?"
+        params.append(int(limit))
+    return [dict(row) for row in conn.execute(query, params)]
+
+
+def search_stats(conn, channel_id, query, start_date, end_date, prompt_version=None, column=None):
+    """
+    Точна статистика відео каналу за період, що відповідають запиту:
+    {'matches', 'total_views', 'avg_views', 'median_views', 'by_category': [{'category', 'matches', 'avg_views'}]}.
+    Розбивка по категоріях - за кешем категорій prompt_version (відео без категорії - під None).
+    Повертає None для порожнього запиту.
+    """
+    match_query = build_match_query(query, column)
+    if match_query is None:
+        return None
+    rows = _match_rows(conn, channel_id, match_query, start_date, end_date, prompt_version)
+    views = sorted(row['views'] for row in rows)
+    stats = {
+        'matches': len(views),
+        'total_views': sum(views),
+        'avg_views': sum(views) / len(views) if views else 0,
+        'median_views': (views[(len(views) - 1) // 2] + views[len(views) // 2]) / 2 if views else 0,
+        'by_category': [],
+    }
+    if prompt_version:
+        views_by_category = {}
+        for row in rows:
+            views_by_category.setdefault(row['category'], []).append(row['views'])
+        stats['by_category'] = sorted(
+            ({'category': category, 'matches': len(values), 'avg_views': sum(values) / len(values)}
+             for category, values in views_by_category.items()),
+            key=lambda item: -item['matches']
+        )
+    return stats
+
+
+def search_videos(conn, channel_id, query, start_date, end_date, prompt_version=None, column=None, limit=20):
+    """Найпопулярніші відео за період, що відповідають запиту (id, title, views, published_at, category)."""
+    match_query = build_match_query(query, column)
+    if match_query is None:
+        return []
+    return _match_rows(conn, channel_id, match_query, start_date, end_date, prompt_version,
+                       order_by="v.views DESC", limit=limit)
+
+
+def title_terms(title):
+    """
+    Слова назви за тими самими правилами, що й токенізатор індексу (літери й цифри разом з апострофом
+    і дефісом, без урахування регістру). Службові слова, однолітерні терми і "слова" без літер/цифр
+    (наприклад, окремий дефіс) пропускаються.
+    """
+    terms = set()
+    for term in _TITLE_TOKEN_RE.findall(normalize_text(title).lower()):
+        if len(term) < 2 or term in STOPWORDS or not any(char.isalnum() for char in term):
+            continue
+        terms.add(term)
+    return terms
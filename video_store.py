@@ -0,0 +1,232 @@
+# video_store.py
+# Локальне сховище відео та кеш категорій на SQLite.
+# Дашборд (app.py) записує сюди всі завантажені відео й отримані категорії,
+# а batch_backfill.py бере звідси відео без категорії і дописує результати Batch API.
+
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+from video_search import ensure_search_index
+
+# Шлях до файлу бази можна перевизначити змінною оточення AINALITICS_DB
+DEFAULT_DB_PATH = os.environ.get("AINALITICS_DB", "ainalitics.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id TEXT PRIMARY KEY,
+    channel_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT,
+    views INTEGER NOT NULL DEFAULT 0,
+    published_at TEXT NOT NULL,
+    duration_seconds INTEGER,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_videos_channel_published ON videos (channel_id, published_at);
+
+CREATE TABLE IF NOT EXISTS video_categories (
+    video_id TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    category TEXT NOT NULL,
+    source TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (video_id, prompt_version)
+);
+
+CREATE TABLE IF NOT EXISTS channel_boilerplate (
+    channel_id TEXT PRIMARY KEY,
+    lines_json TEXT NOT NULL,
+    video_count INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def connect(db_path=None):
+    """Відкриває (і за потреби створює) базу сховища."""
+    conn = sqlite3.connect(db_path or DEFAULT_DB_PATH, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    # WAL дозволяє дашборду читати, поки backfill пише
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    # Повнотекстовий індекс назв і описів підтримується тригерами, тому створюється для кожного з'єднання
+    ensure_search_index(conn)
+    return conn
+
+
+def upsert_videos(conn, channel_id, videos):
+    """
+    Записує або оновлює відео в сховищі.
+    videos - список словників у форматі get_channel_videos (id, title, description, views, published_at, duration_seconds).
+    """
+    now = _now()
+    rows = [
+        (
+            video['id'], channel_id, video['title'], video.get('description') or "",
+            int(video.get('views') or 0), str(video['published_at']),
+            video.get('duration_seconds'), now
+        )
+        for video in videos
+    ]
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO videos (id, channel_id, title, description, views, published_at, duration_seconds, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                title = excluded.title,
+                description = excluded.description,
+                views = excluded.views,
+                published_at = excluded.published_at,
+                duration_seconds = excluded.duration_seconds,
+                updated_at = excluded.updated_at
+            """,
+            rows
+        )
+    return len(rows)
+
+
+def get_cached_categories(conn, video_ids, prompt_version):
+    """Повертає словник {video_id: category} для відео, категорія яких уже є в кеші."""
+    video_ids = list(video_ids)
+    result = {}
+    # SQLite обмежує кількість параметрів у запиті, тому читаємо порціями
+    for start in range(0, len(video_ids), 500):
+        chunk = video_ids[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        cursor = conn.execute(
+            f"SELECT video_id, category FROM video_categories WHERE prompt_version = ? AND video_id IN ({placeholders})",
+            [prompt_version, *chunk]
+        )
+        result.update({row['video_id']: row['category'] for row in cursor})
+    return result
+
+
+def save_categories(conn, categories_by_id, prompt_version, source):
+    """
+    Зберігає категорії в кеш.
+    source - звідки взялась категорія ("sync" для дашборду, "batch" для Batch API,
+    "near_duplicate" - успадкована від майже ідентичного відео без виклику GPT).
+    """
+    now = _now()
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO video_categories (video_id, prompt_version, category, source, created_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(video_id, prompt_version) DO UPDATE SET
+                category = excluded.category,
+                source = excluded.source,
+                created_at = excluded.created_at
+            """,
+            [(video_id, prompt_version, category, source, now) for video_id, category in categories_by_id.items()]
+        )
+    return len(categories_by_id)
+
+
+def get_uncategorized_videos(conn, channel_id, prompt_version, limit=None):
+    """Повертає відео каналу, для яких ще немає категорії з поточною версією промпту (найстаріші першими)."""
+    query = """
+        SELECT v.id, v.title, v.description, v.views, v.published_at
+        FROM videos v
+        LEFT JOIN video_categories c ON c.video_id = v.id AND c.prompt_version = ?
+        WHERE v.channel_id = ? AND c.video_id IS NULL
+        ORDER BY v.published_at
+    """
+    params = [prompt_version, channel_id]
+    if limit:
+        query += " LIMIT ?"
+        params.append(int(limit))
+    return [dict(row) for row in conn.execute(query, params)]
+
+
+def count_uncategorized_videos(conn, channel_id, prompt_version):
+    """Кількість відео каналу без категорії з поточною версією промпту."""
+    return conn.execute(
+        """
+        SELECT COUNT(*) FROM videos v
+        LEFT JOIN video_categories c ON c.video_id = v.id AND c.prompt_version = ?
+        WHERE v.channel_id = ? AND c.video_id IS NULL
+        """,
+        (prompt_version, channel_id)
+    ).fetchone()[0]
+
+
+def get_categorized_videos(conn, channel_id, prompt_version, exclude_source=None, after_rowid=None):
+    """
+    Повертає відео каналу з категорією поточної версії промпту (id, title, description, category, source,
+    category_rowid). after_rowid - лише категорії, вперше записані після запису з цим rowid.
+    """
+    query = """
+        SELECT v.id, v.title, v.description, c.category, c.source, c.rowid AS category_rowid
+        FROM videos v
+        JOIN video_categories c ON c.video_id = v.id AND c.prompt_version = ?
+        WHERE v.channel_id = ?
+    """
+    params = [prompt_version, channel_id]
+    if exclude_source:
+        query += " AND c.source != ?"
+        params.append(exclude_source)
+    if after_rowid:
+        query += " AND c.rowid > ?"
+        params.append(int(after_rowid))
+    return [dict(row) for row in conn.execute(query, params)]
+
+
+def get_channel_videos(conn, channel_id, date_from=None, date_to=None):
+    """Повертає відео каналу (id, title, description, views, published_at), за потреби лише за проміжок дат."""
+    query = "SELECT id, title, description, views, published_at FROM videos WHERE channel_id = ?"
+    params = [channel_id]
+    if date_from:
+        query += " AND substr(published_at, 1, 10) >= ?"
+        params.append(str(date_from))
+    if date_to:
+        query += " AND substr(published_at, 1, 10) <= ?"
+        params.append(str(date_to))
+    return [dict(row) for row in conn.execute(query + " ORDER BY published_at", params)]
+
+
+def count_channel_videos(conn, channel_id):
+    """Кількість відео каналу в сховищі."""
+    return conn.execute("SELECT COUNT(*) FROM videos WHERE channel_id = ?", (channel_id,)).fetchone()[0]
+
+
+def get_channel_descriptions(conn, channel_id, limit):
+    """Повертає описи останніх limit відео каналу."""
+    cursor = conn.execute(
+        "SELECT description FROM videos WHERE channel_id = ? ORDER BY published_at DESC LIMIT ?",
+        (channel_id, int(limit))
+    )
+    return [row['description'] for row in cursor]
+
+
+def get_channel_boilerplate(conn, channel_id):
+    """Повертає закешовані шаблонні рядки опису каналу ({'lines': set, 'video_count': int}) або None."""
+    row = conn.execute(
+        "SELECT lines_json, video_count FROM channel_boilerplate WHERE channel_id = ?", (channel_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {'lines': set(json.loads(row['lines_json'])), 'video_count': row['video_count']}
+
+
+def save_channel_boilerplate(conn, channel_id, lines, video_count):
+    """Зберігає шаблонні рядки опису каналу, вивчені на video_count відео."""
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO channel_boilerplate (channel_id, lines_json, video_count, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(channel_id) DO UPDATE SET
+                lines_json = excluded.lines_json,
+                video_count = excluded.video_count,
+                updated_at = excluded.updated_at
+            """,
+            (channel_id, json.dumps(sorted(lines), ensure_ascii=False), video_count, _now())
+        )
@@ -0,0 +1,145 @@
+# youtube_fetch.py
+# Завантаження відео каналу з YouTube Data API без залежності від Streamlit,
+# щоб ту саму логіку могли використовувати і дашборд, і офлайн-скрипти (batch_backfill.py).
+
+from datetime import datetime, timedelta
+from googleapiclient.discovery import build
+
+from fetch_cache import cached_execute
+from tracing import incr, span
+
+# ID YouTube-каналу "Армія TV"
+CHANNEL_ID = "UCWRZ7gEgbry5FI2-46EX3jA"
+
+# Встановлюємо мінімальну тривалість для "не-Shorts" відео в секундах.
+# Shorts офіційно до 120 секунд.
+# Значення 121 означає, що відео тривалістю 120 секунд буде відфільтроване.
+MIN_DURATION_FOR_REGULAR_VIDEO_SECONDS = 121
+
+
+def parse_iso8601_duration(duration_str):
+    """
+    Парсить тривалість у форматі ISO 8601 (наприклад, "PT1M30S")
+    і повертає загальну кількість секунд.
+    Відео без тривалості або з форматом "P0D" (часто для прямих трансляцій, що завершилися)
+    будуть мати тривалість 0.
+    """
+    if not duration_str or not duration_str.startswith('PT') or duration_str == 'P0D':
+        # P0D іноді зустрічається для відео, які були прямими трансляціями
+        return 0
+
+    hours = 0
+    minutes = 0
+    seconds = 0
+
+    # Видаляємо 'PT' з початку
+    duration_str = duration_str[2:]
+
+    # Години
+    if 'H' in duration_str:
+        parts = duration_str.split('H')
+        hours = int(parts[0])
+        duration_str = parts[1] if len(parts) > 1 else ''
+
+    # Хвилини
+    if 'M' in duration_str:
+        parts = duration_str.split('M')
+        minutes = int(parts[0])
+        duration_str = parts[1] if len(parts) > 1 else ''
+
+    # Секунди
+    if 'S' in duration_str:
+        parts = duration_str.split('S')
+        seconds = int(parts[0])
+
+    total_seconds = hours * 3600 + minutes * 60 + seconds
+    return total_seconds
+
+
+def iter_channel_video_pages(api_key, channel_id, start_date, end_date, fetch_cache=None):
+    """
+    Генератор: віддає відео (словники) з каналу за вказаний період посторінково, по мірі завантаження.
+    Shorts та відео без тривалості відфільтровуються, дублікати за 'id' прибираються між сторінками.
+    fetch_cache - спільний кеш відповідей API (fetch_cache.create_fetch_cache()); None - без кешу.
+    Помилки API не перехоплюються - їх обробляє код, що викликає.
+    """
+    youtube = build('youtube', 'v3', developerKey=api_key)
+    seen_ids = set()
+    next_page_token = None
+
+    # Конвертуємо дати в формат ISO 8601 для YouTube API
+    published_after = start_date.isoformat() + "T00:00:00Z"
+    # Додаємо один день до кінцевої дати, щоб включити весь день
+    published_before = (end_date + timedelta(days=1)).isoformat() + "T00:00:00Z"
+
+    while True:
+        request = youtube.search().list(
+            part='snippet',
+            channelId=channel_id,
+            maxResults=50,  # Максимум за один запит
+            pageToken=next_page_token,
+            type='video',
+            order='date',
+            publishedAfter=published_after,
+            publishedBefore=published_before
+        )
+        with span("youtube.search.list", category="youtube"):
+            response = cached_execute(request, fetch_cache)
+        incr("youtube.requests")
+
+        video_ids = []
+        for item in response.get('items', []):
+            if item.get('id', {}).get('kind') == 'youtube#video':
+                video_ids.append(item['id']['videoId'])
+
+        if not video_ids:
+            break
+
+        video_details_request = youtube.videos().list(
+            part="snippet,statistics,contentDetails",
+            id=",".join(video_ids)
+        )
+        with span("youtube.videos.list", category="youtube", ids=len(video_ids)):
+            video_details_response = cached_execute(video_details_request, fetch_cache)
+        incr("youtube.requests")
+
+        page_videos = []
+        for item in video_details_response.get('items', []):
+            duration_iso = item.get('contentDetails', {}).get('duration')
+
+            if not duration_iso:
+                continue  # Пропускаємо відео, якщо з якоїсь причини немає даних про тривалість
+
+            video_duration_seconds = parse_iso8601_duration(duration_iso)
+
+            if video_duration_seconds < MIN_DURATION_FOR_REGULAR_VIDEO_SECONDS:
+                continue  # Пропускаємо це відео (ймовірно, Shorts або дуже коротке)
+
+            # Видалення дублікатів відео за їх 'id' (залишається перший зустрінутий екземпляр)
+            if item['id'] in seen_ids:
+                continue
+            seen_ids.add(item['id'])
+
+            published_at_str = item['snippet']['publishedAt']
+            page_videos.append({
+                'id': item['id'],  # Це вже videoId
+                'title': item['snippet']['title'],
+                'description': item['snippet']['description'],
+                'views': int(item.get('statistics', {}).get('viewCount', 0)),
+                'published_at': datetime.strptime(published_at_str, "%Y-%m-%dT%H:%M:%SZ").date(),
+                'duration_seconds': video_duration_seconds,
+                'category': "Не визначено"
+            })
+
+        if page_videos:
+            yield page_videos
+
+        next_page_token = response.get('nextPageToken')
+        if not next_page_token:
+            break
+
+
+def fetch_channel_videos(api_key, channel_id, start_date, end_date, fetch_cache=None):
+    """Отримує повний список відео (словників) з каналу за вказаний період."""
+    pages = iter_channel_video_pages(api_key, channel_id, start_date, end_date, fetch_cache=fetch_cache)
+    return [video for page in pages for video in page]